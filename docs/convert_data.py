@@ -3,49 +3,59 @@
 Convert parquet data to JSON for the web app.
 """
 
+import logging
 import pandas as pd
-import json
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
+# The web app is served from docs/, and the pipeline output lives under the repo root
+DOCS_DIR = Path(__file__).resolve().parent
+DATA_PATH = DOCS_DIR.parent / "data" / "processed" / "dili_risk_scores.parquet"
+
+# Output columns and the dtype each one is coerced to
+OUTPUT_DTYPES = {
+    'target_symbol': 'object',
+    'drug_count': 'int64',
+    'total_dili_weight': 'float64',
+    'high_risk_drug_count': 'int64',
+    'dili_risk_ratio': 'float64',
+    'avg_dili_weight': 'float64',
+    'network_dili_score': 'float64',
+    'dili_risk_score': 'float64',
+    'risk_category': 'object'
+}
+
 def convert_data():
     """Convert parquet data to JSON for web app."""
     
     # Read the risk scores data
-    data_path = Path("../data/processed/dili_risk_scores.parquet")
+    data_path = DATA_PATH
     
     if not data_path.exists():
-        print(f"Data file not found: {data_path}")
+        logger.error(f"Data file not found: {data_path}")
         return
     
     df = pd.read_parquet(data_path)
     
-    # Convert to JSON format
-    data = []
-    for _, row in df.iterrows():
-        data.append({
-            'target_symbol': row['target_symbol'],
-            'drug_count': int(row['drug_count']),
-            'total_dili_weight': float(row['total_dili_weight']),
-            'high_risk_drug_count': int(row['high_risk_drug_count']) if pd.notna(row['high_risk_drug_count']) else 0,
-            'dili_risk_ratio': float(row['dili_risk_ratio']),
-            'avg_dili_weight': float(row['avg_dili_weight']),
-            'network_dili_score': float(row.get('network_dili_score_normalized', row['network_dili_score'])),
-            'dili_risk_score': float(row['dili_risk_score']),
-            'risk_category': row['risk_category']
-        })
+    # Convert to JSON format (prefer the normalized network score when present)
+    records = df.assign(
+        network_dili_score=df.get('network_dili_score_normalized', df['network_dili_score']),
+        high_risk_drug_count=df['high_risk_drug_count'].fillna(0)
+    )[list(OUTPUT_DTYPES)].astype(OUTPUT_DTYPES)
     
-    # Save to JSON file
-    output_path = Path("data.json")
-    with open(output_path, 'w') as f:
-        json.dump(data, f, indent=2)
+    # Save to JSON file (pandas' C writer emits the records directly, in a single write)
+    output_path = DOCS_DIR / "data.json"
+    records.to_json(output_path, orient='records', indent=2, double_precision=15)
     
-    print(f"Converted {len(data)} records to {output_path}")
+    logger.info(f"Converted {len(records)} records to {output_path}")
     
-    # Print some statistics
-    print(f"\nStatistics:")
-    print(f"Total targets: {len(data)}")
-    print(f"Risk categories: {df['risk_category'].value_counts().to_dict()}")
-    print(f"Score range: {df['dili_risk_score'].min():.4f} - {df['dili_risk_score'].max():.4f}")
+    # Log some statistics
+    logger.info("Statistics:")
+    logger.info(f"Total targets: {len(records)}")
+    logger.info(f"Risk categories: {df['risk_category'].value_counts().to_dict()}")
+    logger.info(f"Score range: {df['dili_risk_score'].min():.4f} - {df['dili_risk_score'].max():.4f}")
 
 if __name__ == "__main__":
-    convert_data() 
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    convert_data() 
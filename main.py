@@ -7,14 +7,15 @@ for drug targets based on direct DILI evidence and network guilt-by-association.
 """
 
 import logging
+import logging.handlers
 import sys
 from pathlib import Path
 import yaml
-from src.acquisition.acquire_all import acquire_all
 
 # Add src to path for imports
 sys.path.append(str(Path(__file__).parent / "src"))
 
+from acquisition.acquire_all import acquire_all
 from etl.etl import ETL
 from features.dili_risk_scorer import DILIRiskScorer
 from validation.validator import Validator
@@ -22,11 +23,15 @@ from validation.validator import Validator
 
 def setup_logging():
     """Setup logging configuration."""
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         handlers=[
-            logging.StreamHandler(sys.stdout),
+            # Buffer console output and write it out in batches (errors flush immediately)
+            logging.handlers.MemoryHandler(capacity=1024, target=stream_handler),
             logging.FileHandler('pipeline.log')
         ]
     )
@@ -42,7 +47,7 @@ def main():
 
     # Load config
     with open("config/config.yml", "r") as f:
-        config = yaml.safe_load(f)
+        config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
 
     try:
         # Step 0: Data Acquisition
@@ -7,12 +7,35 @@ import yaml
 import pandas as pd
 from google.cloud import bigquery
 from google.auth import default
+import hashlib
+import json
 import logging
+import time
+from pathlib import Path
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# INFORMATION_SCHEMA results rarely change, so they are cached here between runs
+CACHE_DIR = Path("data/interim/bq_cache")
+CACHE_TTL_DAYS = 1
+
+def cached_query(client, project_id, query):
+    """Run a metadata query, reusing a cached result until it expires."""
+    key_data = {'project_id': project_id, 'query': ' '.join(query.split())}
+    key = hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+    path = CACHE_DIR / f"{key}.parquet"
+    
+    if path.exists() and time.time() - path.stat().st_mtime < CACHE_TTL_DAYS * 86400:
+        logger.info(f"Loading cached query result from {path}")
+        return pd.read_parquet(path)
+    
+    df = client.query(query).to_dataframe()
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(path, index=False)
+    return df
+
 def test_known_drug_query():
     """Test querying the known_drug table."""
     
@@ -41,7 +64,7 @@ def test_known_drug_query():
         WHERE table_name = 'known_drug'
         """
         
-        tables_df = client.query(tables_query).to_dataframe()
+        tables_df = cached_query(client, project_id, tables_query)
         logger.info(f"Found known_drug table: {len(tables_df)} rows")
         
         # Test 2: Check schema
@@ -53,7 +76,7 @@ def test_known_drug_query():
         ORDER BY ordinal_position
         """
         
-        schema_df = client.query(schema_query).to_dataframe()
+        schema_df = cached_query(client, project_id, schema_query)
         logger.info(f"Schema columns: {schema_df['column_name'].tolist()}")
         
         # Test 3: Simple query without LIMIT
@@ -63,8 +86,8 @@ def test_known_drug_query():
         FROM `{dataset}.known_drug`
         """
         
-        count_df = client.query(simple_query).to_dataframe()
-        total_rows = count_df['total_rows'].iloc[0]
+        # A single scalar, so read it off the first row rather than building a DataFrame
+        total_rows = next(iter(client.query(simple_query).result()))['total_rows']
         logger.info(f"Total rows in known_drug: {total_rows}")
         
         # Test 4: Query with LIMIT
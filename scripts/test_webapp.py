@@ -3,10 +3,15 @@
 Test script for the web app functionality.
 """
 
-import json
 import requests
+from collections import Counter
 from pathlib import Path
 
+try:
+    from orjson import loads as json_loads
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    from json import loads as json_loads
+
 def test_webapp():
     """Test the web app functionality."""
     
@@ -22,8 +27,7 @@ def test_webapp():
     
     # Load and validate data
     try:
-        with open(data_file, 'r') as f:
-            data = json.load(f)
+        data = json_loads(data_file.read_bytes())
         
         print(f"✅ Loaded {len(data)} targets from data.json")
         
@@ -45,20 +49,17 @@ def test_webapp():
         # Test some sample targets
         test_targets = ['CYP3A4', 'ACE', 'ACHE', 'ADORA1', 'ADRA1A']
         found_targets = []
+        symbols = {t['target_symbol'] for t in data}
         
         for target in test_targets:
-            found = any(t['target_symbol'] == target for t in data)
-            if found:
+            if target in symbols:
                 found_targets.append(target)
                 print(f"✅ Found target: {target}")
             else:
                 print(f"⚠️  Target not found: {target}")
         
         # Show statistics
-        risk_categories = {}
-        for target in data:
-            category = target['risk_category']
-            risk_categories[category] = risk_categories.get(category, 0) + 1
+        risk_categories = Counter(t['risk_category'] for t in data)
         
         print(f"\n📊 Risk Category Distribution:")
         for category, count in risk_categories.items():
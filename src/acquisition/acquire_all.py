@@ -3,17 +3,20 @@ Orchestrate all data acquisition for the Target DILI Risk Score pipeline.
 Downloads/queries all raw data needed for a full pipeline run.
 """
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
 from pathlib import Path
 
+from utils.parquet_io import PARQUET_WRITE_OPTIONS
+
 def acquire_opentargets(config):
     from .opentargets_bigquery import OpenTargetsBigQuery
     project_id = config['bigquery']['project_id']
     dataset = config['bigquery']['dataset']
     disease_ids = config['liver_injury']['disease_ids']
-    client = OpenTargetsBigQuery(project_id, dataset)
+    client = OpenTargetsBigQuery(project_id, dataset, config['bigquery'].get('derived_dataset'))
     df = client.query_liver_injury_evidence(disease_ids)
     out_path = Path('data/interim/liver_injury_evidence.parquet')
-    df.to_parquet(out_path, index=False)
+    df.to_parquet(out_path, index=False, **PARQUET_WRITE_OPTIONS)
     logging.info(f"Saved OpenTargets evidence to {out_path}")
     return out_path
 
@@ -34,25 +37,26 @@ def acquire_fda_dilirank():
 
 def acquire_openfda():
     # User must download OpenFDA bulk JSON manually due to TOS
-    # Place at data/raw/drug-drugsfda-0001-of-0001.json
-    path = Path('data/raw/drug-drugsfda-0001-of-0001.json')
-    if not path.exists():
-        logging.warning(f"OpenFDA bulk JSON not found at {path}. Please download manually from https://open.fda.gov/data/downloads/")
+    # Place the drug-drugsfda-NNNN-of-NNNN.json shards in data/raw
+    from etl.openfda_processor import OPENFDA_SHARD_PATTERN, find_openfda_shards
+    raw_dir = Path('data/raw')
+    paths = find_openfda_shards(raw_dir)
+    if not paths:
+        logging.warning(f"No complete set of OpenFDA bulk JSON shards ({OPENFDA_SHARD_PATTERN}) found in {raw_dir}. Please download manually from https://open.fda.gov/data/downloads/")
     else:
-        logging.info(f"OpenFDA bulk JSON found at {path}")
-    return path
+        logging.info(f"OpenFDA bulk JSON found: {', '.join(path.name for path in paths)}")
+    return paths
 
 def acquire_drug_target_associations(config):
     """Acquire drug-target associations from OpenTargets and create clean mapping."""
     from .opentargets_bigquery import OpenTargetsBigQuery
-    import sys
-    sys.path.append('src/utils')
-    from drug_matching import match_fda_to_opentargets_drugs, validate_drug_matches, create_drug_target_mapping
+    from utils.drug_matching import match_fda_to_opentargets_drugs, validate_drug_matches, create_drug_target_mapping
+    import numpy as np
     import pandas as pd
     
     project_id = config['bigquery']['project_id']
     dataset = config['bigquery']['dataset']
-    client = OpenTargetsBigQuery(project_id, dataset)
+    client = OpenTargetsBigQuery(project_id, dataset, config['bigquery'].get('derived_dataset'))
     
     # Load FDA DILIrank data
     fda_dilirank_path = Path('data/interim/fda_dilirank.parquet')
@@ -61,7 +65,7 @@ def acquire_drug_target_associations(config):
         return None
     
     fda_dilirank_df = pd.read_parquet(fda_dilirank_path)
-    fda_drugs = fda_dilirank_df['Compound Name'].unique().tolist()
+    fda_drugs = pd.unique(fda_dilirank_df['Compound Name'].to_numpy())
     logging.info(f"Loaded {len(fda_drugs)} FDA DILIrank drugs")
     
     # Query OpenTargets drugs
@@ -70,7 +74,7 @@ def acquire_drug_target_associations(config):
         logging.error("Failed to query OpenTargets drugs")
         return None
     
-    ot_drugs = ot_drugs_df['drug_name'].unique().tolist()
+    ot_drugs = pd.unique(ot_drugs_df['drug_name'].to_numpy())
     logging.info(f"Retrieved {len(ot_drugs)} OpenTargets drugs")
     
     # Match FDA drugs to OpenTargets drugs
@@ -78,7 +82,7 @@ def acquire_drug_target_associations(config):
     validate_drug_matches(matches)
     
     # Query drug-target associations for matched drugs
-    matched_ot_drugs = list(matches.values())
+    matched_ot_drugs = np.fromiter(matches.values(), dtype=object, count=len(matches))
     ot_drug_target_df = client.query_drug_target_associations_for_drugs(matched_ot_drugs)
     
     if ot_drug_target_df.empty:
@@ -90,15 +94,23 @@ def acquire_drug_target_associations(config):
     
     # Save clean mapping
     out_path = Path('data/interim/drug_target_mapping_clean.parquet')
-    clean_mapping_df.to_parquet(out_path, index=False)
+    clean_mapping_df.to_parquet(out_path, index=False, **PARQUET_WRITE_OPTIONS)
     logging.info(f"Saved clean drug-target mapping to {out_path}")
     
     return out_path
 
 def acquire_all(config):
-    acquire_opentargets(config)
-    acquire_pathway_commons()
-    acquire_fda_dilirank()
-    acquire_openfda()
+    # The first four steps are independent and I/O-bound, so run them concurrently
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            executor.submit(acquire_opentargets, config),
+            executor.submit(acquire_pathway_commons),
+            executor.submit(acquire_fda_dilirank),
+            executor.submit(acquire_openfda),
+        ]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in done:
+            future.result()  # Re-raise the first failure, if any
+    # Needs the FDA DILIrank output, so runs after the pool
     acquire_drug_target_associations(config)
     logging.info("All acquisition steps complete.") 
\ No newline at end of file
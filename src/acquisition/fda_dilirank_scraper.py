@@ -5,58 +5,130 @@ This module scrapes the FDA DILIrank table to get clinical classifications
 of drugs based on their DILI potential.
 """
 
+import gzip
+import json
+import shutil
+from functools import lru_cache
 import pandas as pd
 import requests
 import logging
 import yaml
 import re
-from bs4 import BeautifulSoup
+from io import BytesIO, StringIO
 from pathlib import Path
 
+from utils.parquet_io import PARQUET_WRITE_OPTIONS
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:  # fall back to BeautifulSoup's pure-Python parser
+    HAS_LXML = False
+
 logger = logging.getLogger(__name__)
 
+# Any table mentioning one of these is taken to be the DILIrank table
+# (inline flag: pandas' lxml flavor only forwards the pattern string)
+DILIRANK_TABLE_RE = re.compile(r'(?i)ltkbid|compound|dili|concern')
+
+RAW_DIR = Path("data/raw")
+HTML_CACHE_PATH = RAW_DIR / "dilirank.html.gz"
+HTML_META_PATH = RAW_DIR / ".dilirank.meta.json"
+
+# DILIrank concern levels and their short category names, in matching order
+DILI_CONCERN_LEVELS = ['Most-DILI-Concern', 'Less-DILI-Concern', 'No-DILI-Concern', 'Ambiguous-DILI-Concern']
+DILI_CONCERN_CATEGORIES = ['Most', 'Less', 'No', 'Ambiguous']
+
+# libyaml-backed loader when PyYAML was built with it
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Shared session so repeated fetches reuse the connection and headers
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+})
+
+@lru_cache(maxsize=1)
 def get_config():
     with open("config/config.yml", "r") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=YAML_LOADER)
+
+def fetch_dilirank_html(url, timeout=30):
+    """Fetch the DILIrank page, reusing the on-disk copy when unchanged.
+
+    Sends a conditional GET using the ETag/Last-Modified of the cached copy;
+    on 304 the gzip-compressed HTML in data/raw is returned as-is, otherwise
+    the response body is streamed straight into the cache.
+    """
+    headers = {}
+    if HTML_CACHE_PATH.exists() and HTML_META_PATH.exists():
+        meta = json.loads(HTML_META_PATH.read_text())
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    with _SESSION.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        if response.status_code == 304:
+            logger.info("DILIrank page not modified, using cached HTML")
+        else:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            RAW_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_path = HTML_CACHE_PATH.with_suffix('.tmp')
+            with gzip.open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(response.raw, f)
+            tmp_path.replace(HTML_CACHE_PATH)
+            HTML_META_PATH.write_text(json.dumps({
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }))
+
+    with gzip.open(HTML_CACHE_PATH, 'rb') as f:
+        return f.read()
 
 def download_and_parse_dilirank(force_html=True):
     config = get_config()
     url = config["apis"]["fda"]["dili_table_url"]
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Accept-Encoding': 'gzip, deflate',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-    }
     logger.info(f"Fetching FDA DILIrank page: {url}")
     try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        content = fetch_dilirank_html(url, timeout=30)
         logger.info("Parsing DILIrank HTML table (forced)")
-        return parse_html_table(soup)
+        return parse_html_table(content)
     except Exception as e:
         logger.error(f"Error fetching FDA DILIrank: {e}")
         return use_fallback_data()
 
-def parse_html_table(soup):
+def parse_html_table(content):
     """Parse DILIrank table from HTML if no download links are available."""
     logger.info("Attempting to parse HTML table")
     
-    # Look for tables with DILIrank data
-    tables = soup.find_all('table')
-    
-    for table in tables:
-        # Check if this table contains DILIrank data
-        table_text = table.get_text().lower()
-        if any(keyword in table_text for keyword in ['ltkbid', 'compound', 'dili', 'concern']):
+    if HAS_LXML:
+        # Let libxml2 parse the page and pick out the DILIrank table
+        try:
+            tables = pd.read_html(BytesIO(content), match=DILIRANK_TABLE_RE, flavor='lxml')
+        except ValueError:
+            tables = []
+        if tables:
             logger.info("Found DILIrank table in HTML")
-            from io import StringIO
-            df = pd.read_html(StringIO(str(table)))[0]
+            df = tables[0]
             save_dilirank_data(df)
-            return
+            return df
+    else:
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(content, 'html.parser')
+        for table in soup.find_all('table'):
+            # Check if this table contains DILIrank data
+            if DILIRANK_TABLE_RE.search(table.get_text()):
+                logger.info("Found DILIrank table in HTML")
+                df = pd.read_html(StringIO(str(table)))[0]
+                save_dilirank_data(df)
+                return df
     
     logger.warning("No DILIrank table found in HTML, using fallback data")
     return use_fallback_data()
@@ -89,18 +161,16 @@ def save_dilirank_data(df):
     # Clean and standardize column names
     df.columns = [col.strip() for col in df.columns]
     
-    # Add derived columns
-    df['dili_concern_category'] = df['vDILIConcern'].map({
-        'Most-DILI-Concern': 'Most',
-        'Less-DILI-Concern': 'Less', 
-        'No-DILI-Concern': 'No',
-        'Ambiguous-DILI-Concern': 'Ambiguous'
-    })
+    # Add derived columns (categorical, so parquet stores them dictionary-encoded)
+    concern_codes = pd.Categorical(df['vDILIConcern'], categories=DILI_CONCERN_LEVELS).codes
+    df['dili_concern_category'] = pd.Categorical.from_codes(
+        concern_codes, categories=DILI_CONCERN_CATEGORIES
+    )
+    df['vDILIConcern'] = df['vDILIConcern'].astype('category')
     
     # Save to parquet
-    df.to_parquet("data/interim/fda_dilirank.parquet", index=False)
+    df.to_parquet("data/interim/fda_dilirank.parquet", index=False, **PARQUET_WRITE_OPTIONS)
     logger.info(f"Saved {len(df)} FDA DILIrank records to data/interim/fda_dilirank.parquet")
-    print(f"Saved {len(df)} FDA DILIrank records")
 
 if __name__ == "__main__":
     download_and_parse_dilirank()
\ No newline at end of file
@@ -6,51 +6,208 @@ to extract target-disease associations for liver injury endpoints.
 """
 
 import os
+import re
 import logging
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 import pandas as pd
+import pyarrow as pa
 from google.cloud import bigquery
 from google.auth import default
+from google.api_core.exceptions import NotFound
+
+from utils.parquet_io import PARQUET_WRITE_OPTIONS
+
+try:
+    from google.cloud import bigquery_storage
+except ImportError:  # Storage Read API is optional; results fall back to REST
+    bigquery_storage = None
 
 logger = logging.getLogger(__name__)
 
+# Evidence columns returned by sample_evidence_data unless others are requested
+SAMPLE_EVIDENCE_COLUMNS = ['targetId', 'diseaseId', 'datatypeId', 'datasourceId', 'score']
+
+# Evidence pre-joined with target symbols and disease names; materialized as
+# evidence_enriched in the derived dataset, or inlined when none is configured
+EVIDENCE_ENRICHED_SQL = """
+        SELECT
+            e.targetId,
+            t.approvedSymbol,
+            e.diseaseId,
+            d.name AS disease_name,
+            d.therapeuticAreas,
+            e.score,
+            e.datatypeId,
+            e.literature
+        FROM `{dataset}.evidence` e
+        JOIN `{dataset}.target` t ON e.targetId = t.id
+        JOIN `{dataset}.disease` d ON e.diseaseId = d.id
+"""
+
+
+@lru_cache(maxsize=1)
+def _get_default_credentials():
+    """Resolve Application Default Credentials once per process."""
+    return default()
+
+
+@lru_cache(maxsize=None)
+def _get_clients(project_id: str):
+    """Create the BigQuery (and Storage Read API) clients for a project, shared across instances."""
+    credentials, default_project = _get_default_credentials()
+    
+    # If no project ID was determined, use the one from config
+    if not default_project:
+        os.environ['GOOGLE_CLOUD_PROJECT'] = project_id
+        logger.info(f"Set GOOGLE_CLOUD_PROJECT to {project_id}")
+    
+    client = bigquery.Client(
+        project=project_id,
+        credentials=credentials
+    )
+    logger.info(f"BigQuery client initialized for project: {project_id}")
+    
+    # Download large results as Arrow over the Storage Read API
+    bqstorage_client = None
+    if bigquery_storage is not None:
+        bqstorage_client = bigquery_storage.BigQueryReadClient(credentials=credentials)
+    
+    return client, bqstorage_client
+
+
+def _top_by(df: pd.DataFrame, column: str, limit: Optional[int]) -> pd.DataFrame:
+    """Order rows by a score column, descending, keeping the top `limit` (with ties)."""
+    # An empty result comes back with object columns, which nlargest cannot rank
+    if df.empty:
+        return df
+    if limit is None:
+        return df.sort_values(column, ascending=False, kind='stable', ignore_index=True)
+    return df.nlargest(limit, column, keep='all').reset_index(drop=True)
+
 
 class OpenTargetsBigQuery:
     """
     Client for querying OpenTargets data from BigQuery.
     """
     
-    def __init__(self, project_id: str, dataset: str):
+    def __init__(self, project_id: str, dataset: str, derived_dataset: Optional[str] = None):
         self.project_id = project_id
         self.dataset = dataset
+        self.derived_dataset = derived_dataset
+        self._materialized = False
         
-        # Set up BigQuery client with proper authentication
+        # Set up BigQuery client with proper authentication (reused across instances)
         try:
-            # Try to get default credentials
-            credentials, default_project = default()
-            
-            # If no project ID was determined, use the one from config
-            if not default_project:
-                os.environ['GOOGLE_CLOUD_PROJECT'] = project_id
-                logger.info(f"Set GOOGLE_CLOUD_PROJECT to {project_id}")
-            
-            self.client = bigquery.Client(
-                project=project_id,
-                credentials=credentials
-            )
-            logger.info(f"BigQuery client initialized for project: {project_id}")
-            
+            self.client, self.bqstorage_client = _get_clients(project_id)
         except Exception as e:
             logger.error(f"Failed to initialize BigQuery client: {e}")
             raise
     
-    def query_liver_injury_evidence(self, disease_ids: List[str], disease_names: Optional[List[str]] = None) -> pd.DataFrame:
+    def _run(self, query: str, job_config: Optional[bigquery.QueryJobConfig] = None,
+             category_cols: Optional[List[str]] = None) -> pd.DataFrame:
+        """Run a query and download its result, as Arrow over the Storage Read API when available.
+        
+        Args:
+            query: SQL query to run
+            job_config: Optional job configuration (e.g. query parameters)
+            category_cols: Low-cardinality string columns to return as categoricals
+            
+        Returns:
+            DataFrame with the query result
+        """
+        rows = self.client.query(query, job_config=job_config).result()
+        batches = list(rows.to_arrow_iterable(bqstorage_client=self.bqstorage_client))
+        if batches:
+            table = pa.Table.from_batches(batches)
+            del batches
+            # self_destruct releases each Arrow column as soon as it is converted
+            df = table.to_pandas(self_destruct=True, split_blocks=True)
+        else:
+            df = pd.DataFrame(columns=[field.name for field in rows.schema])
+        
+        if category_cols:
+            df = df.astype({col: 'category' for col in category_cols})
+        return df
+    
+    def _run_small(self, query: str, max_results: int = 1000,
+                   job_config: Optional[bigquery.QueryJobConfig] = None) -> pd.DataFrame:
+        """Run a query with a small result and read it from the jobs.query response.
+        
+        query_and_wait returns the first page inline, so no result-table
+        fetch or Storage Read session is needed for inspection-sized results.
+        
+        Args:
+            query: SQL query to run
+            max_results: Maximum number of rows to return
+            job_config: Optional job configuration (e.g. query parameters)
+            
+        Returns:
+            DataFrame with the query result
+        """
+        rows = self.client.query_and_wait(query, job_config=job_config, max_results=max_results)
+        return rows.to_dataframe(create_bqstorage_client=False)
+    
+    def ensure_materialized(self) -> str:
+        """Create the evidence_enriched table in the derived dataset, rebuilding it when stale.
+        
+        The table name carries the source dataset, so pointing the config at another
+        release builds a new table, and a table older than the last update of the
+        source evidence table is rebuilt.
+        
+        Returns:
+            Fully qualified table ID of evidence_enriched
+        """
+        source_suffix = re.sub(r'\W+', '_', self.dataset).strip('_').lower()
+        table_id = f"{self.derived_dataset}.evidence_enriched_{source_suffix}"
+        if self._materialized:
+            return table_id
+        
+        source = self.client.get_table(f"{self.dataset}.evidence")
+        try:
+            existing = self.client.get_table(table_id)
+        except NotFound:
+            existing = None
+        if existing is not None and existing.created >= source.modified:
+            self._materialized = True
+            return table_id
+        
+        # The derived dataset has to live next to the public source data (US multi-region)
+        derived = bigquery.Dataset(self.derived_dataset)
+        derived.location = "US"
+        self.client.create_dataset(derived, exists_ok=True)
+        
+        # STRING columns cannot be partition keys, so datatypeId leads the clustering instead
+        query = f"""
+        CREATE OR REPLACE TABLE `{table_id}`
+        CLUSTER BY datatypeId, targetId, diseaseId
+        AS {EVIDENCE_ENRICHED_SQL.format(dataset=self.dataset)}
+        """
+        reason = "stale" if existing is not None else "missing"
+        logger.info(f"Materializing evidence table {table_id} ({reason})")
+        self.client.query(query).result()
+        self._materialized = True
+        return table_id
+    
+    def _evidence_source(self) -> str:
+        """FROM clause source for pre-joined evidence (materialized table or inline join)."""
+        if self.derived_dataset:
+            try:
+                return f"`{self.ensure_materialized()}`"
+            except Exception as e:
+                logger.warning(f"Failed to materialize evidence table, joining at query time: {e}")
+        return f"({EVIDENCE_ENRICHED_SQL.format(dataset=self.dataset)})"
+    
+    def query_liver_injury_evidence(self, disease_ids: List[str], disease_names: Optional[List[str]] = None,
+                                    limit: Optional[int] = 10000, include_literature: bool = False) -> pd.DataFrame:
         """
         Query liver injury evidence from OpenTargets.
         
         Args:
             disease_ids: List of disease IDs to query
             disease_names: Optional list of disease names for logging
+            limit: Keep only the top-scoring records (ties at the cutoff included); None keeps all
+            include_literature: Also fetch the (large, repeated) literature column
             
         Returns:
             DataFrame with liver injury evidence
@@ -60,29 +217,36 @@ class OpenTargetsBigQuery:
         
         logger.info(f"Querying liver injury evidence for diseases: {list(zip(disease_ids, disease_names))}")
         
-        # Build the query
-        disease_conditions = " OR ".join([f"e.diseaseId = '{disease_id}'" for disease_id in disease_ids])
+        columns = [
+            'e.targetId',
+            'e.approvedSymbol as target_name',
+            'e.diseaseId as disease_id',
+            'e.disease_name',
+            'e.score',
+            'e.datatypeId as datatype'
+        ]
+        if include_literature:
+            columns.append('e.literature')
         
         query = f"""
         SELECT 
-            e.targetId,
-            t.approvedSymbol as target_name,
-            e.diseaseId as disease_id,
-            d.name as disease_name,
-            e.score,
-            e.datatypeId as datatype,
-            e.literature
-        FROM `{self.dataset}.evidence` e
-        JOIN `{self.dataset}.target` t ON e.targetId = t.id
-        JOIN `{self.dataset}.disease` d ON e.diseaseId = d.id
-        WHERE ({disease_conditions})
+            {', '.join(columns)}
+        FROM {self._evidence_source()} e
+        WHERE e.diseaseId IN UNNEST(@disease_ids)
         AND e.score > 0
-        ORDER BY e.score DESC
-        LIMIT 10000
         """
+        query_parameters = [bigquery.ArrayQueryParameter('disease_ids', 'STRING', disease_ids)]
+        if limit is not None:
+            # Cap the transfer at the top `limit` rows (with ties) per disease; ranking within each
+            # disease avoids a global sort, and the overall top `limit` is always among these rows
+            query += "QUALIFY RANK() OVER (PARTITION BY e.diseaseId ORDER BY e.score DESC) <= @limit\n"
+            query_parameters.append(bigquery.ScalarQueryParameter('limit', 'INT64', limit))
+        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
         
         try:
-            df = self.client.query(query).to_dataframe()
+            df = self._run(query, job_config, category_cols=['datatype'])
+            # Rank locally rather than paying for a global sort in BigQuery
+            df = _top_by(df, 'score', limit)
             logger.info(f"Retrieved {len(df)} evidence records")
             return df
         except Exception as e:
@@ -108,7 +272,7 @@ class OpenTargetsBigQuery:
         """
         
         logger.info("Querying all targets")
-        df = self.client.query(query).to_dataframe()
+        df = self._run(query, category_cols=['biotype'])
         logger.info(f"Retrieved {len(df)} targets")
         
         return df
@@ -128,50 +292,52 @@ class OpenTargetsBigQuery:
             e.diseaseId,
             e.score,
             e.datatypeId,
-            d.name as disease_name,
-            d.therapeuticAreas
-        FROM `{self.dataset}.evidence` e
-        JOIN `{self.dataset}.disease` d 
-            ON e.diseaseId = d.id
-        WHERE e.targetId IN ({','.join([f"'{t}'" for t in target_ids])})
+            e.disease_name,
+            e.therapeuticAreas
+        FROM {self._evidence_source()} e
+        WHERE e.targetId IN UNNEST(@target_ids)
         AND e.score > 0.1
         """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter('target_ids', 'STRING', target_ids)],
+            use_query_cache=True
+        )
         
         logger.info(f"Querying disease associations for {len(target_ids)} targets")
-        df = self.client.query(query).to_dataframe()
+        df = self._run(query, job_config, category_cols=['datatypeId'])
         logger.info(f"Retrieved {len(df)} associations")
         
         return df
     
-    def query_drug_target_associations(self) -> pd.DataFrame:
+    def query_drug_target_associations(self, limit: Optional[int] = 100000) -> pd.DataFrame:
         """
-        Query drug-target associations from OpenTargets.
+        Query drug-target associations from OpenTargets, aggregated per target and datatype.
         
+        Args:
+            limit: Keep only the top rows by max score (ties at the cutoff included); None keeps all
+            
         Returns:
-            DataFrame with drug-target associations
+            DataFrame with evidence count and max/average score per target and datatype
         """
         logger.info("Querying drug-target associations")
         
         query = f"""
         SELECT 
             e.targetId,
-            t.approvedSymbol as target_name,
-            e.diseaseId as disease_id,
-            d.name as disease_name,
-            e.score,
+            e.approvedSymbol as target_name,
             e.datatypeId as datatype,
-            e.literature
-        FROM `{self.dataset}.evidence` e
-        JOIN `{self.dataset}.target` t ON e.targetId = t.id
-        JOIN `{self.dataset}.disease` d ON e.diseaseId = d.id
+            COUNT(*) as n_evidence,
+            MAX(e.score) as max_score,
+            AVG(e.score) as avg_score
+        FROM {self._evidence_source()} e
         WHERE e.datatypeId IN ('known_drug', 'clinical_trial')
         AND e.score > 0
-        ORDER BY e.score DESC
-        LIMIT 100000
+        GROUP BY e.targetId, e.approvedSymbol, e.datatypeId
         """
         
         try:
-            df = self.client.query(query).to_dataframe()
+            df = self._run(query, category_cols=['datatype'])
+            df = _top_by(df, 'max_score', limit)
             logger.info(f"Retrieved {len(df)} drug-target associations")
             return df
         except Exception as e:
@@ -202,7 +368,7 @@ class OpenTargetsBigQuery:
         """
         
         try:
-            df = self.client.query(query).to_dataframe()
+            df = self._run(query, category_cols=['drugType'])
             logger.info(f"Retrieved {len(df)} drugs from OpenTargets known_drug table")
             return df
         except Exception as e:
@@ -238,7 +404,7 @@ class OpenTargetsBigQuery:
         """
         
         try:
-            df = self.client.query(query).to_dataframe()
+            df = self._run(query, category_cols=['drugType', 'status'])
             logger.info(f"Retrieved {len(df)} drug-target associations")
             return df
         except Exception as e:
@@ -257,9 +423,6 @@ class OpenTargetsBigQuery:
         """
         logger.info(f"Querying drug-target associations for {len(drug_names)} drugs")
         
-        # Create drug name conditions for the query
-        drug_conditions = " OR ".join([f"LOWER(prefName) LIKE '%{drug.lower()}%'" for drug in drug_names])
-        
         query = f"""
         SELECT 
             drugId,
@@ -276,12 +439,18 @@ class OpenTargetsBigQuery:
         AND prefName IS NOT NULL
         AND prefName != ''
         AND targetId IS NOT NULL
-        AND ({drug_conditions})
+        AND LOWER(prefName) IN UNNEST(@drug_names)
         ORDER BY prefName
         """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter('drug_names', 'STRING', [drug.lower() for drug in drug_names])
+            ],
+            use_query_cache=True
+        )
         
         try:
-            df = self.client.query(query).to_dataframe()
+            df = self._run(query, job_config, category_cols=['drugType', 'status'])
             logger.info(f"Retrieved {len(df)} drug-target associations for specified drugs")
             return df
         except Exception as e:
@@ -306,12 +475,15 @@ class OpenTargetsBigQuery:
             data_type,
             is_nullable
         FROM `{self.dataset}.INFORMATION_SCHEMA.COLUMNS`
-        WHERE table_name = '{table_name}'
+        WHERE table_name = @table_name
         ORDER BY ordinal_position
         """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter('table_name', 'STRING', table_name)]
+        )
         
         try:
-            df = self.client.query(query).to_dataframe()
+            df = self._run_small(query, job_config=job_config)
             logger.info(f"Retrieved schema for {table_name} with {len(df)} columns")
             return df
         except Exception as e:
@@ -361,7 +533,7 @@ class OpenTargetsBigQuery:
         """
         
         try:
-            df = self.client.query(query).to_dataframe()
+            df = self._run_small(query)
             tables = df['table_name'].tolist()
             logger.info(f"Found {len(tables)} tables: {tables}")
             return tables
@@ -369,26 +541,33 @@ class OpenTargetsBigQuery:
             logger.error(f"Failed to list tables: {e}")
             return []
 
-    def sample_evidence_data(self, limit: int = 10) -> pd.DataFrame:
+    def sample_evidence_data(self, limit: int = 10, columns: Optional[List[str]] = None) -> pd.DataFrame:
         """
         Sample data from the evidence table to understand the structure.
         
         Args:
             limit: Number of rows to sample
+            columns: Evidence columns to select (defaults to SAMPLE_EVIDENCE_COLUMNS)
             
         Returns:
             DataFrame with sample evidence data
         """
+        if columns is None:
+            columns = SAMPLE_EVIDENCE_COLUMNS
+        
         logger.info(f"Sampling {limit} rows from evidence table")
         
         query = f"""
-        SELECT *
+        SELECT {', '.join(f'`{column}`' for column in columns)}
         FROM `{self.dataset}.evidence`
-        LIMIT {limit}
+        LIMIT @limit
         """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter('limit', 'INT64', limit)]
+        )
         
         try:
-            df = self.client.query(query).to_dataframe()
+            df = self._run_small(query, max_results=limit, job_config=job_config)
             logger.info(f"Retrieved {len(df)} sample rows from evidence table")
             return df
         except Exception as e:
@@ -405,7 +584,8 @@ if __name__ == "__main__":
     
     client = OpenTargetsBigQuery(
         project_id=config["bigquery"]["project_id"],
-        dataset=config["bigquery"]["dataset"]
+        dataset=config["bigquery"]["dataset"],
+        derived_dataset=config["bigquery"].get("derived_dataset")
     )
     
     # Query liver injury evidence
@@ -414,5 +594,6 @@ if __name__ == "__main__":
     )
     
     # Save to interim data
-    liver_evidence.to_parquet("data/interim/liver_injury_evidence.parquet", index=False)
+    liver_evidence.to_parquet("data/interim/liver_injury_evidence.parquet", index=False,
+                              **PARQUET_WRITE_OPTIONS)
     print(f"Saved {len(liver_evidence)} liver injury evidence records") 
\ No newline at end of file
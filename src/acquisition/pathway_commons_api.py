@@ -5,35 +5,143 @@ This module provides functionality to query Pathway Commons for protein-protein
 interaction networks and pathway data.
 """
 
+import csv
+import functools
+import hashlib
+import inspect
+import io
 import logging
 import json
-from typing import Dict, List, Optional, Set
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
 import pandas as pd
 import requests
 import networkx as nx
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.parquet_io import PARQUET_WRITE_OPTIONS
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    from json import loads as json_loads
 
 logger = logging.getLogger(__name__)
 
+# Graphs with more nodes than this use sampled (approximate) betweenness centrality
+BETWEENNESS_SAMPLE_SIZE = 500
+
+def _betweenness_centrality(G: nx.Graph) -> Dict:
+    # Sample pivots for betweenness (O(V*E) exact) on large graphs
+    k = BETWEENNESS_SAMPLE_SIZE if G.number_of_nodes() > BETWEENNESS_SAMPLE_SIZE else None
+    return nx.betweenness_centrality(G, k=k, seed=42)
+
+
+def _avg_path_length(G: nx.Graph) -> Dict:
+    # Average shortest path length to other reachable nodes
+    return {
+        node: sum(lengths.values()) / (len(lengths) - 1) if len(lengths) > 1 else float('inf')
+        for node, lengths in nx.all_pairs_shortest_path_length(G)
+    }
+
+
+# Per-node network metrics: name -> (output column, graph-wide function)
+NETWORK_METRICS = {
+    'degree': ('degree_centrality', nx.degree_centrality),
+    'betweenness': ('betweenness_centrality', _betweenness_centrality),
+    'closeness': ('closeness_centrality', nx.closeness_centrality),
+    'eigenvector': ('eigenvector_centrality', nx.eigenvector_centrality_numpy),
+    'clustering': ('clustering_coefficient', nx.clustering),
+    'avg_path_length': ('avg_path_length', _avg_path_length),
+}
+# All metrics are computed by default; callers that only need the cheap ones pass these
+FAST_NETWORK_METRICS = ('degree', 'clustering')
+
+# Parsed API responses are cached here as parquet and reused until they expire
+CACHE_DIR = Path("data/interim/pc_cache")
+CACHE_TTL_DAYS = 30
+
+# Large ID lists are split into chunks of this size and requested concurrently
+ID_CHUNK_SIZE = 50
+MAX_WORKERS = 8
+
+
+def _disk_cached(method):
+    """Cache a query method's DataFrame result on disk, keyed on its arguments.
+    
+    ID lists are sorted before hashing, so the same set of IDs hits the same
+    entry. Empty results (including failed requests) are not cached.
+    """
+    signature = inspect.signature(method)
+    
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.cache_dir is None:
+            return method(self, *args, **kwargs)
+        
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        params = {
+            name: sorted(value) if isinstance(value, (list, tuple, set)) else value
+            for name, value in bound.arguments.items() if name != 'self'
+        }
+        key_data = {'ep': method.__name__, 'base_url': self.base_url, 'params': params}
+        key = hashlib.sha256(json.dumps(key_data, sort_keys=True, default=str).encode()).hexdigest()
+        path = self.cache_dir / f"{key}.parquet"
+        
+        if path.exists() and time.time() - path.stat().st_mtime < self.cache_ttl_days * 86400:
+            logger.info(f"Loading cached {method.__name__} result from {path}")
+            return pd.read_parquet(path)
+        
+        df = method(self, *args, **kwargs)
+        if not df.empty:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(path, index=False, **PARQUET_WRITE_OPTIONS)
+        return df
+    
+    return wrapper
+
 
 class PathwayCommonsAPI:
     """Client for Pathway Commons API."""
 
-    def __init__(self, base_url: str = "https://www.pathwaycommons.org/pc2/"):
+    def __init__(self, base_url: str = "https://www.pathwaycommons.org/pc2/",
+                 cache_dir: Optional[Path] = CACHE_DIR, cache_ttl_days: float = CACHE_TTL_DAYS):
         """Initialize the API client.
         
         Args:
             base_url: Pathway Commons API base URL
+            cache_dir: Directory for cached responses (None disables caching)
+            cache_ttl_days: Age in days after which a cached response is refetched
         """
         self.base_url = base_url
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.cache_ttl_days = cache_ttl_days
         self.session = requests.Session()
         self.session.headers.update({
             'Accept': 'application/json',
+            'Accept-Encoding': 'gzip',
             'User-Agent': 'Target-DILI-Risk-Score/1.0'
         })
+        # Pooled keep-alive connections for the concurrent chunk requests; the queries
+        # are read-only, so POSTs are retried too
+        retry = Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset({'GET', 'POST'}))
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
+    @_disk_cached
     def get_interactions(self, source_ids: List[str], target_ids: Optional[List[str]] = None) -> pd.DataFrame:
         """Get protein-protein interactions.
         
+        When target IDs are given, the source IDs are queried in concurrent
+        chunks. Without targets the query asks for paths among all source IDs,
+        which cannot be split, so it is sent as a single request.
+        
         Args:
             source_ids: List of source protein IDs (UniProt)
             target_ids: Optional list of target protein IDs
@@ -41,27 +149,22 @@ class PathwayCommonsAPI:
         Returns:
             DataFrame with interaction data
         """
-        endpoint = f"{self.base_url}graph"
-        
-        params = {
-            'source': ','.join(source_ids),
-            'kind': 'PATHSBETWEEN',
-            'format': 'json'
-        }
+        logger.info(f"Querying interactions for {len(source_ids)} source proteins")
         
         if target_ids:
-            params['target'] = ','.join(target_ids)
-        
-        logger.info(f"Querying interactions for {len(source_ids)} source proteins")
+            chunks = [source_ids[i:i + ID_CHUNK_SIZE] for i in range(0, len(source_ids), ID_CHUNK_SIZE)]
+        else:
+            chunks = [source_ids]
         
         try:
-            response = self.session.get(endpoint, params=params, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            interactions = self._parse_interactions(data)
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(chunks))) as executor:
+                dfs = list(executor.map(lambda chunk: self._get_interactions_chunk(chunk, target_ids), chunks))
             
-            df = pd.DataFrame(interactions)
+            df = pd.concat(dfs, ignore_index=True)
+            if not df.empty:
+                df = df.drop_duplicates(ignore_index=True).astype(
+                    {'interaction_type': 'category', 'data_source': 'category'}
+                )
             logger.info(f"Retrieved {len(df)} interactions")
             
             return df
@@ -70,34 +173,51 @@ class PathwayCommonsAPI:
             logger.error(f"Error querying Pathway Commons: {e}")
             return pd.DataFrame()
     
-    def _parse_interactions(self, data: Dict) -> List[Dict]:
-        """Parse interaction data from API response.
+    def _get_interactions_chunk(self, source_ids: List[str], target_ids: Optional[List[str]] = None) -> pd.DataFrame:
+        """Request interactions for one chunk of source IDs.
         
         Args:
-            data: API response data
+            source_ids: Chunk of source protein IDs
+            target_ids: Optional list of target protein IDs
             
         Returns:
-            List of interaction dictionaries
+            DataFrame with interaction data for the chunk
         """
-        interactions = []
+        endpoint = f"{self.base_url}graph"
         
-        if 'graph' not in data:
-            return interactions
+        params = {
+            'source': ','.join(source_ids),
+            'kind': 'PATHSBETWEEN',
+            'format': 'json'
+        }
+        
+        if target_ids:
+            params['target'] = ','.join(target_ids)
         
-        graph = data['graph']
+        response = self.session.get(endpoint, params=params, timeout=30)
+        response.raise_for_status()
         
-        if 'edges' in graph:
-            for edge in graph['edges']:
-                interaction = {
-                    'source_id': edge.get('source', ''),
-                    'target_id': edge.get('target', ''),
-                    'interaction_type': edge.get('interactionType', ''),
-                    'data_source': edge.get('dataSource', ''),
-                    'score': edge.get('score', 0.0)
-                }
-                interactions.append(interaction)
+        data = json_loads(response.content)
+        return self._parse_interactions(data)
+    
+    def _parse_interactions(self, data: Dict) -> pd.DataFrame:
+        """Parse interaction data from API response.
         
-        return interactions
+        Args:
+            data: API response data
+            
+        Returns:
+            DataFrame with one row per interaction edge
+        """
+        edges = data.get('graph', {}).get('edges', [])
+        rows = [
+            (edge.get('source', ''), edge.get('target', ''), edge.get('interactionType', ''),
+             edge.get('dataSource', ''), edge.get('score', 0.0))
+            for edge in edges
+        ]
+        return pd.DataFrame.from_records(
+            rows, columns=['source_id', 'target_id', 'interaction_type', 'data_source', 'score']
+        )
     
     def build_protein_network(self, protein_ids: List[str]) -> nx.Graph:
         """Build a protein interaction network.
@@ -117,25 +237,25 @@ class PathwayCommonsAPI:
             logger.warning("No interactions found, returning empty graph")
             return nx.Graph()
         
-        # Build NetworkX graph
-        G = nx.Graph()
-        
-        for _, row in interactions_df.iterrows():
-            source = row['source_id']
-            target = row['target_id']
-            weight = row.get('score', 1.0)
-            
-            G.add_edge(source, target, weight=weight)
+        # Build NetworkX graph, with the interaction score as edge weight
+        edges_df = interactions_df.assign(weight=interactions_df['score'].astype(float).fillna(1.0))
+        G = nx.from_pandas_edgelist(edges_df, source='source_id', target='target_id', edge_attr='weight')
         
         logger.info(f"Built network with {G.number_of_nodes()} nodes and {G.number_of_edges()} edges")
         
         return G
     
-    def get_network_metrics(self, G: nx.Graph) -> pd.DataFrame:
+    def get_network_metrics(self, G: nx.Graph, metrics: Iterable[str] = tuple(NETWORK_METRICS)) -> pd.DataFrame:
         """Calculate network metrics for proteins.
         
+        Only the requested metrics are computed (all of them by default).
+        'degree' and 'clustering' are cheap (FAST_NETWORK_METRICS); 'closeness' and 'avg_path_length' need all-pairs shortest paths,
+        'betweenness' is O(V*E) (sampled on large graphs) and 'eigenvector'
+        solves an eigenproblem over the whole adjacency matrix.
+        
         Args:
             G: NetworkX graph
+            metrics: Metric names to compute (keys of NETWORK_METRICS, default all)
             
         Returns:
             DataFrame with network metrics per protein
@@ -143,39 +263,24 @@ class PathwayCommonsAPI:
         if G.number_of_nodes() == 0:
             return pd.DataFrame()
         
-        metrics = []
+        unknown = set(metrics) - set(NETWORK_METRICS)
+        if unknown:
+            raise ValueError(f"Unknown network metrics: {sorted(unknown)}")
         
-        for node in G.nodes():
-            # Centrality measures
-            degree_cent = nx.degree_centrality(G).get(node, 0.0)
-            betweenness_cent = nx.betweenness_centrality(G).get(node, 0.0)
-            closeness_cent = nx.closeness_centrality(G).get(node, 0.0)
-            eigenvector_cent = nx.eigenvector_centrality_numpy(G).get(node, 0.0)
-            
-            # Clustering coefficient
-            clustering_coef = nx.clustering(G, node)
-            
-            # Average shortest path length to other nodes
-            try:
-                avg_path_length = nx.average_shortest_path_length(G, source=node)
-            except nx.NetworkXError:
-                avg_path_length = float('inf')
-            
-            metrics.append({
-                'protein_id': node,
-                'degree_centrality': degree_cent,
-                'betweenness_centrality': betweenness_cent,
-                'closeness_centrality': closeness_cent,
-                'eigenvector_centrality': eigenvector_cent,
-                'clustering_coefficient': clustering_coef,
-                'avg_path_length': avg_path_length
-            })
-        
-        df = pd.DataFrame(metrics)
+        # Graph-wide measures are computed once and looked up per node
+        nodes = list(G.nodes())
+        data = {'protein_id': nodes}
+        for name in metrics:
+            column, compute = NETWORK_METRICS[name]
+            values = compute(G)
+            data[column] = [values.get(node, 0.0) for node in nodes]
+        
+        df = pd.DataFrame(data)
         logger.info(f"Calculated metrics for {len(df)} proteins")
         
         return df
     
+    @_disk_cached
     def get_pathways(self, protein_ids: List[str]) -> pd.DataFrame:
         """Get pathway information for proteins.
         
@@ -199,10 +304,8 @@ class PathwayCommonsAPI:
             response = self.session.get(endpoint, params=params, timeout=30)
             response.raise_for_status()
             
-            data = response.json()
-            pathways = self._parse_pathways(data)
-            
-            df = pd.DataFrame(pathways)
+            data = json_loads(response.content)
+            df = self._parse_pathways(data)
             logger.info(f"Retrieved {len(df)} pathway associations")
             
             return df
@@ -211,37 +314,29 @@ class PathwayCommonsAPI:
             logger.error(f"Error querying pathways: {e}")
             return pd.DataFrame()
     
-    def _parse_pathways(self, data: Dict) -> List[Dict]:
+    def _parse_pathways(self, data: Dict) -> pd.DataFrame:
         """Parse pathway data from API response.
         
         Args:
             data: API response data
             
         Returns:
-            List of pathway dictionaries
+            DataFrame with one row per pathway node
         """
-        pathways = []
-        
-        if 'graph' not in data:
-            return pathways
-        
-        graph = data['graph']
-        
-        if 'nodes' in graph:
-            for node in graph['nodes']:
-                if 'pathway' in node.get('type', ''):
-                    pathway = {
-                        'pathway_id': node.get('id', ''),
-                        'pathway_name': node.get('name', ''),
-                        'data_source': node.get('dataSource', ''),
-                        'pathway_type': node.get('type', '')
-                    }
-                    pathways.append(pathway)
-        
-        return pathways
+        nodes = data.get('graph', {}).get('nodes', [])
+        rows = [
+            (node.get('id', ''), node.get('name', ''), node.get('dataSource', ''), node.get('type', ''))
+            for node in nodes if 'pathway' in node.get('type', '')
+        ]
+        return pd.DataFrame.from_records(
+            rows, columns=['pathway_id', 'pathway_name', 'data_source', 'pathway_type']
+        )
 
+    @_disk_cached
     def query_neighborhood_v2(self, ids: List[str], format: str = "BINARY_SIF", limit: int = 100) -> pd.DataFrame:
         """Query Pathway Commons v2 /neighborhood endpoint (POST).
+        
+        IDs are posted in concurrent chunks and the neighborhoods are combined.
         Args:
             ids: List of gene/protein IDs (HGNC, UniProt, etc.)
             format: Output format (default: BINARY_SIF)
@@ -249,23 +344,32 @@ class PathwayCommonsAPI:
         Returns:
             DataFrame with interaction data
         """
+        if format != "BINARY_SIF":
+            return pd.DataFrame()
+        
+        chunks = [ids[i:i + ID_CHUNK_SIZE] for i in range(0, len(ids), ID_CHUNK_SIZE)] or [ids]
+        try:
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(chunks))) as executor:
+                dfs = list(executor.map(lambda chunk: self._query_neighborhood_chunk(chunk, format, limit), chunks))
+            df = pd.concat(dfs, ignore_index=True).drop_duplicates(ignore_index=True)
+            return df.astype({"interaction": "category"})
+        except Exception as e:
+            logger.error(f"Error in /v2/neighborhood: {e}")
+            return pd.DataFrame()
+
+    def _query_neighborhood_chunk(self, ids: List[str], format: str, limit: int) -> pd.DataFrame:
+        """POST one chunk of IDs to /v2/neighborhood and parse the SIF response."""
         endpoint = f"{self.base_url}v2/neighborhood"
         payload = {
             "source": ids,
             "format": format,
             "limit": limit
         }
-        try:
-            resp = self.session.post(endpoint, json=payload, timeout=60)
-            resp.raise_for_status()
-            if format == "BINARY_SIF":
-                return self._parse_binary_sif(resp.text)
-            else:
-                return pd.DataFrame()
-        except Exception as e:
-            logger.error(f"Error in /v2/neighborhood: {e}")
-            return pd.DataFrame()
+        resp = self.session.post(endpoint, json=payload, timeout=60)
+        resp.raise_for_status()
+        return self._parse_binary_sif(resp.text)
 
+    @_disk_cached
     def query_pathbetween_v2(self, source_ids: List[str], target_ids: List[str], format: str = "BINARY_SIF") -> pd.DataFrame:
         """Query Pathway Commons v2 /pathbetween endpoint (POST).
         Args:
@@ -299,16 +403,20 @@ class PathwayCommonsAPI:
         Returns:
             DataFrame with columns: source, interaction, target
         """
-        rows = []
-        for line in sif_text.strip().split("\n"):
-            parts = line.strip().split("\t")
-            if len(parts) == 3:
-                rows.append({
-                    "source": parts[0],
-                    "interaction": parts[1],
-                    "target": parts[2]
-                })
-        return pd.DataFrame(rows)
+        if not sif_text.strip():
+            return pd.DataFrame(columns=["source", "interaction", "target"])
+        # Rows with more than three fields are skipped; short rows are padded with empty strings
+        # (na_filter=False), so an empty interaction field stays '' as in the line parser
+        df = pd.read_csv(
+            io.StringIO(sif_text), sep="\t", header=None, names=["source", "interaction", "target"],
+            dtype={"source": "string", "interaction": "category", "target": "string"},
+            quoting=csv.QUOTE_NONE, on_bad_lines="skip", engine="c", na_filter=False
+        )
+        # Each line used to be stripped before splitting, which trims the outer edges of source
+        # and target and drops lines whose source or target is blank
+        df["source"] = df["source"].str.lstrip()
+        df["target"] = df["target"].str.rstrip()
+        return df[df["source"].ne("") & df["target"].ne("")].reset_index(drop=True)
 
 
 if __name__ == "__main__":
@@ -318,7 +426,12 @@ if __name__ == "__main__":
     with open("config/config.yml", "r") as f:
         config = yaml.safe_load(f)
     
-    api = PathwayCommonsAPI(base_url=config["apis"]["pathway_commons"]["base_url"])
+    pc_config = config["apis"]["pathway_commons"]
+    api = PathwayCommonsAPI(
+        base_url=pc_config["base_url"],
+        cache_dir=pc_config.get("cache_dir", CACHE_DIR),
+        cache_ttl_days=pc_config.get("cache_ttl_days", CACHE_TTL_DAYS)
+    )
     
     # Example protein IDs (UniProt)
     protein_ids = ["P04637", "P53_HUMAN", "Q9Y6K9"]  # p53, NFKB1
@@ -330,5 +443,5 @@ if __name__ == "__main__":
     metrics_df = api.get_network_metrics(network)
     
     # Save to interim data
-    metrics_df.to_parquet("data/interim/network_metrics.parquet", index=False)
+    metrics_df.to_parquet("data/interim/network_metrics.parquet", index=False, **PARQUET_WRITE_OPTIONS)
     print(f"Saved network metrics for {len(metrics_df)} proteins") 
\ No newline at end of file
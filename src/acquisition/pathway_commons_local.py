@@ -1,10 +1,16 @@
 import os
+import csv
 import gzip
+import shutil
 import requests
+import numpy as np
 import pandas as pd
 import networkx as nx
+import scipy.sparse
+from scipy.sparse import csgraph
 from tqdm import tqdm
-import pickle
+
+from utils.parquet_io import PARQUET_WRITE_OPTIONS
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), '../../data/raw')
 SIF_URL = 'https://download.baderlab.org/PathwayCommons/PC2/v14/pc-hgnc.sif.gz'
@@ -13,8 +19,13 @@ MAPPING_URL = 'https://download.baderlab.org/PathwayCommons/PC2/v14/pc-hgnc.txt.
 MAPPING_PATH = os.path.join(DATA_DIR, 'pc-hgnc.txt.gz')
 UNIPROT_URL = 'https://download.baderlab.org/PathwayCommons/PC2/v14/uniprot.txt'
 UNIPROT_PATH = os.path.join(DATA_DIR, 'uniprot.txt')
-GRAPH_PICKLE = os.path.join(DATA_DIR, 'pc-hgnc_graph.pkl')
-MAP_PICKLE = os.path.join(DATA_DIR, 'pc-hgnc_map.pkl')
+GRAPH_EDGES_PATH = os.path.join(DATA_DIR, 'pc-hgnc_edges.parquet')
+MAPPING_PARQUET = os.path.join(DATA_DIR, 'pc-hgnc_mapping.parquet')
+UNIPROT_PARQUET = os.path.join(DATA_DIR, 'pc-hgnc_uniprot.parquet')
+ADJACENCY_PATH = os.path.join(DATA_DIR, 'pc-hgnc_adjacency.npz')
+NODES_PATH = os.path.join(DATA_DIR, 'pc-hgnc_nodes.npy')
+ALIAS_PARQUET = os.path.join(DATA_DIR, 'pc-hgnc_alias2row.parquet')
+ALIAS_COLUMNS = ['NAME', 'HGNC_ID', 'UNIPROT', 'ENSEMBL']
 GMT_PATH = os.path.join(DATA_DIR, 'pc-hgnc.gmt.gz')
 
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -22,24 +33,27 @@ os.makedirs(DATA_DIR, exist_ok=True)
 def download_file(url, path):
     if not os.path.exists(path):
         print(f"Downloading {url} ...")
-        r = requests.get(url, stream=True)
-        r.raise_for_status()
-        with open(path, 'wb') as f:
-            for chunk in tqdm(r.iter_content(1024*1024), desc=f"{os.path.basename(path)}", unit='MB'):
-                f.write(chunk)
+        tmp_path = path + '.part'
+        with requests.get(url, stream=True) as r:
+            r.raise_for_status()
+            r.raw.decode_content = True
+            total = int(r.headers.get('Content-Length', 0)) or None
+            # Stream straight from the socket in 16 MiB blocks; tqdm only counts the writes
+            with open(tmp_path, 'wb') as f, tqdm.wrapattr(f, 'write', total=total, desc=os.path.basename(path)) as out:
+                shutil.copyfileobj(r.raw, out, 16 * 1024 * 1024)
+        os.replace(tmp_path, path)
     else:
         print(f"{path} already exists.")
 
 def parse_sif(path):
     print(f"Parsing SIF: {path}")
-    G = nx.Graph()
-    with gzip.open(path, 'rt') as f:
-        for line in tqdm(f, desc="SIF lines"):
-            parts = line.strip().split('\t')
-            if len(parts) == 3:
-                a, interaction, b = parts
-                G.add_edge(a, b, interaction=interaction)
-    return G
+    # C parser with gzip decoding; rows without exactly three fields are dropped
+    df = pd.read_csv(
+        path, sep='\t', header=None, names=['a', 'interaction', 'b'],
+        dtype='category', compression='gzip', quoting=csv.QUOTE_NONE,
+        on_bad_lines='skip', engine='c'
+    ).dropna()
+    return nx.from_pandas_edgelist(df, 'a', 'b', edge_attr='interaction')
 
 def parse_mapping(path):
     print(f"Parsing mapping: {path}")
@@ -59,19 +73,79 @@ def build_all():
     G = parse_sif(SIF_PATH)
     mapping_df = parse_mapping(MAPPING_PATH)
     uniprot_df = parse_uniprot(UNIPROT_PATH)
-    with open(GRAPH_PICKLE, 'wb') as f:
-        pickle.dump(G, f)
-    with open(MAP_PICKLE, 'wb') as f:
-        pickle.dump({'mapping': mapping_df, 'uniprot': uniprot_df}, f)
-    print(f"Saved graph to {GRAPH_PICKLE} and mapping to {MAP_PICKLE}")
+    save_graph(G)
+    save_csr_graph(G)
+    mapping_df.to_parquet(MAPPING_PARQUET, index=False, **PARQUET_WRITE_OPTIONS)
+    uniprot_df.to_parquet(UNIPROT_PARQUET, index=False, **PARQUET_WRITE_OPTIONS)
+    alias2row = build_alias_index(mapping_df)
+    pd.DataFrame({'alias': list(alias2row), 'row': list(alias2row.values())}).to_parquet(
+        ALIAS_PARQUET, index=False, **PARQUET_WRITE_OPTIONS
+    )
+    print(f"Saved graph to {GRAPH_EDGES_PATH} and mapping to {MAPPING_PARQUET}, {UNIPROT_PARQUET}")
+
+def save_graph(g):
+    # Store the edge list columnar; gene symbols and interaction types dictionary-encode well
+    edges_df = nx.to_pandas_edgelist(g, source='src', target='dst').astype('category')
+    edges_df.to_parquet(GRAPH_EDGES_PATH, index=False, **PARQUET_WRITE_OPTIONS)
 
 def load_graph():
-    with open(GRAPH_PICKLE, 'rb') as f:
-        return pickle.load(f)
+    edges_df = pd.read_parquet(GRAPH_EDGES_PATH)
+    return nx.from_pandas_edgelist(edges_df, 'src', 'dst', edge_attr='interaction')
+
+def save_csr_graph(g):
+    # Compact CSR adjacency plus node labels, for lookups without rebuilding the networkx graph
+    nodes = np.array(list(g.nodes()), dtype=str)
+    adjacency = nx.to_scipy_sparse_array(g, nodelist=list(g.nodes()), weight=None, dtype=np.int8, format='csr')
+    scipy.sparse.save_npz(ADJACENCY_PATH, scipy.sparse.csr_matrix(adjacency))
+    np.save(NODES_PATH, nodes)
+
+def load_csr_graph():
+    nodes = np.load(NODES_PATH)
+    adjacency = scipy.sparse.load_npz(ADJACENCY_PATH).tocsr()
+    return {'nodes': nodes, 'adjacency': adjacency, 'index': {node: i for i, node in enumerate(nodes)}}
+
+def csr_neighbors(csr, node):
+    i = csr['index'].get(node)
+    if i is None:
+        return []
+    adjacency = csr['adjacency']
+    return csr['nodes'][adjacency.indices[adjacency.indptr[i]:adjacency.indptr[i + 1]]].tolist()
+
+def csr_degree(csr, node):
+    i = csr['index'].get(node)
+    if i is None:
+        return 0
+    adjacency = csr['adjacency']
+    return int(adjacency.indptr[i + 1] - adjacency.indptr[i])
+
+def csr_shortest_path(csr, source, target):
+    i, j = csr['index'].get(source), csr['index'].get(target)
+    if i is None or j is None:
+        return None
+    _, predecessors = csgraph.shortest_path(csr['adjacency'], directed=False, unweighted=True,
+                                            indices=i, return_predecessors=True)
+    if i != j and predecessors[j] < 0:
+        return None
+    path = [j]
+    while path[-1] != i:
+        path.append(predecessors[path[-1]])
+    return csr['nodes'][path[::-1]].tolist()
+
+def build_alias_index(mapping_df):
+    # Map every symbol/HGNC/UniProt/Ensembl alias to the first mapping row that carries it;
+    # stack() is row-major, so the first occurrence of an alias is its lowest row
+    aliases = mapping_df[ALIAS_COLUMNS].reset_index(drop=True).stack()
+    aliases = aliases[~aliases.duplicated()]
+    return dict(zip(aliases.to_numpy(), aliases.index.get_level_values(0)))
 
 def load_mapping():
-    with open(MAP_PICKLE, 'rb') as f:
-        return pickle.load(f)
+    mapping_df = pd.read_parquet(MAPPING_PARQUET)
+    if os.path.exists(ALIAS_PARQUET):
+        alias_df = pd.read_parquet(ALIAS_PARQUET)
+        alias2row = dict(zip(alias_df['alias'], alias_df['row']))
+    else:
+        alias2row = build_alias_index(mapping_df)
+    return {'mapping': mapping_df, 'uniprot': pd.read_parquet(UNIPROT_PARQUET), 'alias2row': alias2row}
 
 def get_neighbors(g, node):
     return list(g.neighbors(node)) if node in g else []
@@ -86,11 +160,10 @@ def shortest_path(g, source, target):
         return None
 
 def map_gene(mapping, query):
-    # Try symbol, HGNC, UniProt, Ensembl
-    df = mapping['mapping']
-    hits = df[(df['NAME'] == query) | (df['HGNC_ID'] == query) | (df['UNIPROT'] == query) | (df['ENSEMBL'] == query)]
-    if not hits.empty:
-        return hits.iloc[0].to_dict()
+    # Try symbol, HGNC, UniProt, Ensembl via the precomputed alias index
+    idx = mapping['alias2row'].get(query)
+    if idx is not None:
+        return mapping['mapping'].iloc[idx].to_dict()
     return None
 
 def main():
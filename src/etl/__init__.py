@@ -9,11 +9,14 @@ This module contains the components for data extraction, transformation, and loa
 """
 
 from .etl import ETL
-from .drug_utils import normalize_drug_name
+from .drug_utils import normalize_drug_name, normalize_series
 from .openfda_processor import (
     parse_openfda_bulk_data,
+    parse_openfda_bulk_files,
     create_drug_approval_lookup,
     match_drugs_to_approval_status,
+    load_openfda_lookup,
+    find_openfda_shards,
     fetch_openfda_approval_status
 )
 from .drug_target_builder import DrugTargetBuilder
@@ -22,9 +25,12 @@ from .network_builder import NetworkBuilder
 __all__ = [
     'ETL',
     'normalize_drug_name',
+    'normalize_series',
     'parse_openfda_bulk_data',
+    'parse_openfda_bulk_files',
     'create_drug_approval_lookup',
     'match_drugs_to_approval_status',
+    'load_openfda_lookup',
     'fetch_openfda_approval_status',
     'DrugTargetBuilder',
     'NetworkBuilder'
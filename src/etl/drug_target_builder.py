@@ -5,14 +5,23 @@ Builds the core drug-target table with DILIrank severity data
 and OpenFDA approval status.
 """
 
+import numpy as np
 import pandas as pd
 import logging
 from pathlib import Path
 
+from utils.drug_matching import SEVERITY_WEIGHTS
+from utils.parquet_io import PARQUET_WRITE_OPTIONS
 from .openfda_processor import fetch_openfda_approval_status
 
 logger = logging.getLogger(__name__)
 
+STORAGE_DTYPES = {
+    'fda_dili_concern': 'category',
+    'approval_status': 'category',
+    'fda_drug_name': 'string[pyarrow]'
+}
+
 
 class DrugTargetBuilder:
     """Builds drug-target table with DILIrank data and approval status."""
@@ -44,40 +53,48 @@ class DrugTargetBuilder:
             logger.error("Clean drug-target mapping not found. Run acquisition first.")
             return pd.DataFrame()
         
+        # Every mapping column is carried into the published table, so none are pruned here; numpy
+        # dtypes keep the published table's schema free of ArrowDtype pandas metadata
         drug_target_df = pd.read_parquet(mapping_path)
-        logger.info(f"Loaded {len(drug_target_df)} clean drug-target mappings")
+        logger.info("Loaded %d clean drug-target mappings", len(drug_target_df))
         
         # Add DILI severity weights (already included in clean mapping)
         if 'dili_severity_weight' not in drug_target_df.columns:
-            severity_weights = {
-                'Most-DILI-Concern': 2.0,
-                'Less-DILI-Concern': 1.0, 
-                'No-DILI-Concern': 0.0,
-                'Ambiguous-DILI-Concern': 0.5
-            }
-            
-            drug_target_df['dili_severity_weight'] = drug_target_df['fda_dili_concern'].map(
-                severity_weights
-            ).fillna(0)
+            # Gather weights by category code; unknown concerns (code -1) get 0
+            codes = pd.Categorical(
+                drug_target_df['fda_dili_concern'], categories=SEVERITY_WEIGHTS.index
+            ).codes
+            drug_target_df['dili_severity_weight'] = np.where(
+                codes >= 0, SEVERITY_WEIGHTS.to_numpy()[codes], 0.0
+            )
         
         # Fetch OpenFDA approval status and merge
-        unique_drugs = drug_target_df['fda_drug_name'].dropna().unique().tolist()
-        logger.info(f"Fetching OpenFDA approval status for {len(unique_drugs)} unique drugs...")
+        unique_drugs = pd.Series(drug_target_df['fda_drug_name'].dropna().unique())
+        logger.info("Fetching OpenFDA approval status for %d unique drugs...", len(unique_drugs))
         approval_df = fetch_openfda_approval_status(unique_drugs)
-        logger.info(f"Fetched approval status for {len(approval_df)} drugs")
+        logger.info("Fetched approval status for %d drugs", len(approval_df))
         
-        # Merge approval status into drug_target_df
+        # Merge approval status into drug_target_df (one status per drug, so rows never fan out)
+        approval_df = approval_df.drop_duplicates('drug_name')
         drug_target_df = drug_target_df.merge(
-            approval_df.rename(columns={'drug_name': 'fda_drug_name'}),
-            on='fda_drug_name', how='left'
+            approval_df.rename(columns={'drug_name': 'fda_drug_name'})[['fda_drug_name', 'approval_status']],
+            on='fda_drug_name', how='left', validate='m:1'
         )
         
-        # Add withdrawn status column (after merge)
-        drug_target_df['withdrawn'] = drug_target_df['approval_status'] == 'withdrawn'
+        # Add withdrawn status column (after merge), comparing categorical codes rather than strings
+        drug_target_df['approval_status'] = drug_target_df['approval_status'].astype('category')
+        categories = drug_target_df['approval_status'].cat.categories
+        if 'withdrawn' in categories:
+            withdrawn_code = categories.get_loc('withdrawn')
+            drug_target_df['withdrawn'] = drug_target_df['approval_status'].cat.codes.to_numpy() == withdrawn_code
+        else:
+            drug_target_df['withdrawn'] = False
         
         # Save drug-target table
         output_path = self.processed_dir / "drug_target_table.parquet"
-        drug_target_df.to_parquet(output_path, index=False)
-        logger.info(f"Saved drug-target table with {len(drug_target_df)} records")
+        drug_target_df.astype(
+            {col: dtype for col, dtype in STORAGE_DTYPES.items() if col in drug_target_df.columns}
+        ).to_parquet(output_path, index=False, **PARQUET_WRITE_OPTIONS)
+        logger.info("Saved drug-target table with %d records", len(drug_target_df))
         
         return drug_target_df 
\ No newline at end of file
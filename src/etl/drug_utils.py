@@ -7,9 +7,14 @@ across different data sources.
 
 import re
 import logging
+import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# Patterns are compiled once at import rather than looked up on every call
+_WS_RE = re.compile(r'\s+')
+_SUFFIX_RE = re.compile(r'\b(hcl|hydrochloride|sulfate|citrate|phosphate|acetate|sodium|potassium|calcium|magnesium)\b')
+
 
 def normalize_drug_name(name: str) -> str:
     """Normalize drug name for matching.
@@ -24,7 +29,29 @@ def normalize_drug_name(name: str) -> str:
         return ""
     # Convert to lowercase, remove extra spaces, remove common suffixes
     normalized = name.lower().strip()
-    normalized = re.sub(r'\s+', ' ', normalized)  # Multiple spaces to single
-    normalized = re.sub(r'\b(hcl|hydrochloride|sulfate|citrate|phosphate|acetate|sodium|potassium|calcium|magnesium)\b', '', normalized)
+    normalized = _WS_RE.sub(' ', normalized)  # Multiple spaces to single
+    normalized = _SUFFIX_RE.sub('', normalized)
     normalized = normalized.strip()
-    return normalized 
\ No newline at end of file
+    return normalized
+
+
+def normalize_series(names: pd.Series) -> pd.Series:
+    """Normalize a Series of drug names; vectorized equivalent of normalize_drug_name.
+    
+    Each distinct name is normalized once and broadcast back, since drug name
+    columns are typically highly duplicated.
+    
+    Args:
+        names: Raw drug names (missing values normalize to "")
+        
+    Returns:
+        Series of normalized drug names
+    """
+    codes, uniques = pd.factorize(names.fillna('').astype(str))
+    normalized = (
+        pd.Series(uniques, dtype=object).str.lower().str.strip()
+        .str.replace(_WS_RE, ' ', regex=True)
+        .str.replace(_SUFFIX_RE, '', regex=True)
+        .str.strip()
+    )
+    return pd.Series(normalized.to_numpy()[codes], index=names.index, name=names.name) 
\ No newline at end of file
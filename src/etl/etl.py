@@ -8,6 +8,7 @@ Builds the core data tables needed for DILI risk assessment:
 
 import pandas as pd
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict
 
@@ -45,11 +46,14 @@ class ETL:
         """
         logger.info("=== Running ETL Pipeline ===")
         
-        # Build drug-target table
-        drug_target_df = self.drug_target_builder.build_drug_target_table()
-        
-        # Build target network
-        network_df = self.network_builder.build_target_network()
+        # Drug-target table and target network are independent, so build them concurrently;
+        # threads share the logging setup and the builders, and both stages are I/O-bound
+        # pyarrow/pandas work that releases the GIL
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            drug_target_future = executor.submit(self.drug_target_builder.build_drug_target_table)
+            network_future = executor.submit(self.network_builder.build_target_network)
+            drug_target_df = drug_target_future.result()
+            network_df = network_future.result()
         
         logger.info("=== ETL Pipeline Complete ===")
         
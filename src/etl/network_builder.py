@@ -6,9 +6,15 @@ for guilt-by-association analysis.
 """
 
 import pandas as pd
+import pyarrow.parquet as pq
 import logging
 from pathlib import Path
 
+from utils.parquet_io import PARQUET_WRITE_OPTIONS
+
+# Pathway Commons columns needed for the network and mapping tables
+NETWORK_COLUMNS = ['target1', 'implicated_target', 'risk_targets', 'n_risk_targets']
+
 logger = logging.getLogger(__name__)
 
 
@@ -42,8 +48,12 @@ class NetworkBuilder:
             logger.warning("Pathway Commons data not found, creating empty network")
             return pd.DataFrame()
         
-        network_df = pd.read_parquet(pc_path)
-        logger.info(f"Loaded {len(network_df)} target-target associations")
+        available = set(pq.read_schema(pc_path).names)
+        network_df = pd.read_parquet(
+            pc_path,
+            columns=[col for col in NETWORK_COLUMNS if col in available]
+        )
+        logger.info("Loaded %d target-target associations", len(network_df))
         
         # Standardize column names
         if 'implicated_target' in network_df.columns:
@@ -51,27 +61,15 @@ class NetworkBuilder:
         
         # Create mapping from gene symbols to Pathway Commons targets
         # The risk_targets column contains gene symbols that match OpenTargets targets
-        mapping_data = []
-        
-        for idx, row in network_df.iterrows():
-            pc_target = row['target1']
-            risk_targets_str = row['risk_targets']
-            
-            if pd.notna(risk_targets_str):
-                # Split the semicolon-separated gene symbols
-                gene_symbols = risk_targets_str.split(';')
-                
-                for gene_symbol in gene_symbols:
-                    gene_symbol = gene_symbol.strip()
-                    if gene_symbol:  # Skip empty strings
-                        mapping_data.append({
-                            'pc_target': pc_target,
-                            'gene_symbol': gene_symbol,
-                            'n_risk_targets': row['n_risk_targets']
-                        })
-        
-        # Create mapping DataFrame
-        mapping_df = pd.DataFrame(mapping_data)
+        # (one row per non-empty semicolon-separated gene symbol)
+        mapping_df = network_df[['target1', 'n_risk_targets', 'risk_targets']].dropna(subset=['risk_targets'])
+        mapping_df = mapping_df.assign(gene_symbol=mapping_df['risk_targets'].str.split(';'))
+        mapping_df = mapping_df.explode('gene_symbol', ignore_index=True)
+        mapping_df['gene_symbol'] = mapping_df['gene_symbol'].str.strip()
+        mapping_df = mapping_df[mapping_df['gene_symbol'].astype(bool)]
+        mapping_df = mapping_df.rename(columns={'target1': 'pc_target'})[
+            ['pc_target', 'gene_symbol', 'n_risk_targets']
+        ].reset_index(drop=True)
         
         # Save both the original network and the mapping
         network_output_path = self.processed_dir / "target_network.parquet"
@@ -84,10 +82,10 @@ class NetworkBuilder:
         if available_cols:
             network_df = network_df[available_cols]
         
-        network_df.to_parquet(network_output_path, index=False)
-        mapping_df.to_parquet(mapping_output_path, index=False)
+        network_df.to_parquet(network_output_path, index=False, **PARQUET_WRITE_OPTIONS)
+        mapping_df.to_parquet(mapping_output_path, index=False, **PARQUET_WRITE_OPTIONS)
         
-        logger.info(f"Saved target network with {len(network_df)} records")
-        logger.info(f"Saved target mapping with {len(mapping_df)} gene symbol mappings")
+        logger.info("Saved target network with %d records", len(network_df))
+        logger.info("Saved target mapping with %d gene symbol mappings", len(mapping_df))
         
         return network_df 
\ No newline at end of file
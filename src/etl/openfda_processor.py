@@ -4,16 +4,72 @@ OpenFDA Data Processor.
 Processes OpenFDA bulk data and matches drug names to approval status.
 """
 
-import json
+import os
+import re
+import weakref
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import logging
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List
+from rapidfuzz import fuzz, process
+from typing import BinaryIO, Dict, List, Tuple, Union
 
-from .drug_utils import normalize_drug_name
+from utils.parquet_io import PARQUET_WRITE_OPTIONS
+from .drug_utils import normalize_series
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    from json import loads as json_loads
+
+try:
+    import ijson
+except ImportError:  # ijson is optional; fall back to decoding the whole document
+    ijson = None
 
 logger = logging.getLogger(__name__)
 
+# Approval lookups by id() of the OpenFDA DataFrame they were built from
+_lookup_cache: Dict[int, Tuple[Dict[str, str], pd.Index, pd.Categorical]] = {}
+
+OPENFDA_JSON_PATH = Path("data/raw/drug-drugsfda-0001-of-0001.json")
+OPENFDA_SHARD_PATTERN = "drug-drugsfda-*-of-*.json"
+OPENFDA_SHARD_RE = re.compile(r'drug-drugsfda-(\d+)-of-(\d+)\.json')
+OPENFDA_LOOKUP_PATH = Path("data/interim/openfda_lookup.parquet")
+LOOKUP_COLUMNS = ['drug_name', 'normalized_name', 'approval_status']
+# Arrow-backed strings for names, categoricals for the low-cardinality status columns
+OPENFDA_DTYPES = {
+    'drug_name': 'string[pyarrow]',
+    'normalized_name': 'string[pyarrow]',
+    'brand_name': 'string[pyarrow]',
+    'marketing_status': 'category'
+}
+# Parquet metadata key holding the source shards' names, mtimes and sizes
+CACHE_KEY_FIELD = b'openfda_source'
+# Product fields needed for approval matching, as an Arrow struct type
+PRODUCT_TYPE = pa.struct([
+    ('brand_name', pa.string()),
+    ('marketing_status', pa.string()),
+    ('active_ingredients', pa.list_(pa.struct([('name', pa.string())])))
+])
+PRODUCT_FIELDS = PRODUCT_TYPE.names
+
+# Minimum token set similarity (0-100) for a fuzzy approval status match
+FUZZY_MATCH_CUTOFF = 90
+# Score matrix cells per batched fuzzy matching call (float32, so ~64 MB)
+FUZZY_BATCH_CELLS = 16 * 1024 * 1024
+
+# Marketing status patterns, checked in this order
+APPROVAL_STATUSES = ['withdrawn', 'approved', 'other', 'unknown']
+WITHDRAWN_STATUS_RE = re.compile(r'discontinued|withdrawn', re.IGNORECASE)
+APPROVED_STATUS_RE = re.compile(r'approved|prescription|otc|over-the-counter', re.IGNORECASE)
+
 
 def parse_openfda_bulk_data(json_path: str) -> pd.DataFrame:
     """
@@ -25,68 +81,105 @@ def parse_openfda_bulk_data(json_path: str) -> pd.DataFrame:
     Returns:
         DataFrame with columns: ['drug_name', 'normalized_name', 'brand_name', 'generic_name', 'marketing_status', 'approval_status']
     """
-    logger.info(f"Parsing OpenFDA bulk data from {json_path}...")
+    logger.info("Parsing OpenFDA bulk data from %s...", json_path)
     
-    with open(json_path, 'r') as f:
-        data = json.load(f)
+    with open(json_path, 'rb') as f:
+        product_rows, total_records = _read_products(f)
     
-    results = []
-    total_records = len(data['results'])
-    logger.info(f"Processing {total_records} drug records...")
+    # Flatten products -> active ingredients with Arrow list kernels
+    products = pa.array(product_rows, type=PRODUCT_TYPE)
+    del product_rows
+    brand_names = _trimmed(pc.struct_field(products, 'brand_name'))
+    marketing_status = _trimmed(pc.struct_field(products, 'marketing_status'))
+    ingredients = pc.struct_field(products, 'active_ingredients')
+    logger.info("Flattened %d records into %d products", total_records, len(products))
     
-    for i, record in enumerate(data['results']):
-        if i % 1000 == 0:
-            logger.info(f"Processed {i}/{total_records} records...")
-        
-        products = record.get('products', [])
-        for product in products:
-            brand_name = product.get('brand_name', '').strip()
-            active_ingredients = product.get('active_ingredients', [])
-            marketing_status = product.get('marketing_status', '').strip()
-            
-            # Extract generic names from active ingredients
-            generic_names = []
-            for ingredient in active_ingredients:
-                generic_name = ingredient.get('name', '').strip()
-                if generic_name:
-                    generic_names.append(generic_name)
-            
-            # Create entries for brand name and generic names
-            drug_names = [brand_name] + generic_names if brand_name else generic_names
-            
-            for drug_name in drug_names:
-                if drug_name:  # Skip empty names
-                    normalized = normalize_drug_name(drug_name)
-                    
-                    # Determine approval status from marketing status
-                    if marketing_status:
-                        status_lower = marketing_status.lower()
-                        if 'discontinued' in status_lower or 'withdrawn' in status_lower:
-                            approval_status = 'withdrawn'
-                        elif 'approved' in status_lower or 'prescription' in status_lower:
-                            approval_status = 'approved'
-                        elif 'otc' in status_lower or 'over-the-counter' in status_lower:
-                            approval_status = 'approved'
-                        else:
-                            approval_status = 'other'
-                    else:
-                        approval_status = 'unknown'
-                    
-                    results.append({
-                        'drug_name': drug_name,
-                        'normalized_name': normalized,
-                        'brand_name': brand_name,
-                        'generic_name': '; '.join(generic_names) if generic_names else '',
-                        'marketing_status': marketing_status,
-                        'approval_status': approval_status
-                    })
-    
-    df = pd.DataFrame(results)
-    logger.info(f"Extracted {len(df)} drug entries from OpenFDA data")
+    # Generic names per product, dropping blank ingredient names
+    generics = pd.DataFrame({
+        'product': pc.list_parent_indices(ingredients).to_numpy(),
+        'drug_name': _trimmed(pc.struct_field(pc.list_flatten(ingredients), 'name')).to_numpy(zero_copy_only=False)
+    })
+    generics = generics[generics['drug_name'] != '']
+    
+    product_df = pd.DataFrame({
+        'brand_name': brand_names.to_numpy(zero_copy_only=False),
+        'generic_name': generics.groupby('product')['drug_name'].agg('; '.join),
+        'marketing_status': marketing_status.to_numpy(zero_copy_only=False)
+    }, index=pd.RangeIndex(len(products)))
+    product_df['approval_status'] = _approval_status(product_df['marketing_status'])
+    product_df['generic_name'] = product_df['generic_name'].fillna('')
+    
+    # One entry for the brand name (if any) followed by one per generic name, in product order
+    brands = product_df.loc[product_df['brand_name'] != '', ['brand_name']].rename(columns={'brand_name': 'drug_name'})
+    entries = pd.concat([
+        brands.assign(product=brands.index, position=-1),
+        generics.assign(position=generics.groupby('product').cumcount())
+    ], ignore_index=True).sort_values(['product', 'position'], kind='stable')
+    
+    df = product_df.iloc[entries['product'].to_numpy()].reset_index(drop=True)
+    df.insert(0, 'drug_name', entries['drug_name'].to_numpy())
+    
+    # Normalize all names in one vectorized pass
+    df.insert(1, 'normalized_name', normalize_series(df['drug_name']))
+    df = df.astype(OPENFDA_DTYPES)
+    logger.info("Extracted %d drug entries from OpenFDA data", len(df))
     
     return df
 
 
+def _read_products(f: BinaryIO) -> Tuple[List[dict], int]:
+    """
+    Collect the product fields needed for approval matching from an OpenFDA drugsfda file.
+    
+    Records are streamed with ijson when it is installed, so only one record (plus the
+    trimmed products kept so far) is held in memory at a time.
+    
+    Args:
+        f: OpenFDA JSON file opened in binary mode
+        
+    Returns:
+        Tuple of (product dicts with PRODUCT_FIELDS only, number of drug records)
+    """
+    if ijson is None:
+        records = json_loads(f.read())['results']
+    else:
+        records = ijson.items(f, 'results.item')
+    
+    product_rows = []
+    total_records = 0
+    for record in records:
+        total_records += 1
+        for product in record.get('products') or []:
+            product_rows.append({field: product.get(field) for field in PRODUCT_FIELDS})
+    
+    logger.info("Processing %d drug records...", total_records)
+    return product_rows, total_records
+
+
+def _trimmed(array: pa.Array) -> pa.Array:
+    """Strip whitespace from a string array, with missing values as ''."""
+    return pc.utf8_trim_whitespace(pc.fill_null(array, ''))
+
+
+def _approval_status(marketing_status: pd.Series) -> pd.Categorical:
+    """Derive approval status from product marketing status strings."""
+    # Marketing status takes only a handful of distinct values, so classify each once
+    codes, uniques = pd.factorize(marketing_status)
+    status_codes = np.array([_classify_marketing_status(status) for status in uniques], dtype=np.int8)
+    return pd.Categorical.from_codes(status_codes[codes], categories=APPROVAL_STATUSES)
+
+
+def _classify_marketing_status(marketing_status: str) -> int:
+    """Get the APPROVAL_STATUSES code for one marketing status string."""
+    if not marketing_status:
+        return APPROVAL_STATUSES.index('unknown')
+    if WITHDRAWN_STATUS_RE.search(marketing_status):
+        return APPROVAL_STATUSES.index('withdrawn')
+    if APPROVED_STATUS_RE.search(marketing_status):
+        return APPROVAL_STATUSES.index('approved')
+    return APPROVAL_STATUSES.index('other')
+
+
 def create_drug_approval_lookup(openfda_df: pd.DataFrame) -> Dict[str, str]:
     """
     Create a lookup dictionary mapping drug names to approval status.
@@ -99,108 +192,240 @@ def create_drug_approval_lookup(openfda_df: pd.DataFrame) -> Dict[str, str]:
     """
     logger.info("Creating drug approval lookup...")
     
-    # Create lookup with both original and normalized names
-    lookup = {}
-    
-    for _, row in openfda_df.iterrows():
-        drug_name = row['drug_name']
-        normalized = row['normalized_name']
-        approval_status = row['approval_status']
-        
-        # Add both original and normalized names to lookup
-        if drug_name:
-            lookup[drug_name.lower()] = approval_status
-        if normalized:
-            lookup[normalized] = approval_status
+    # Create lookup with both original and normalized names, interleaved per row so
+    # later rows still overwrite earlier ones exactly as a row-by-row build would
+    names = np.column_stack([
+        openfda_df['drug_name'].fillna('').str.lower().to_numpy(dtype=object),
+        openfda_df['normalized_name'].fillna('').to_numpy(dtype=object)
+    ]).ravel()
+    statuses = np.repeat(openfda_df['approval_status'].to_numpy(dtype=object), 2)
+    has_name = names != ''
+    lookup = dict(zip(names[has_name], statuses[has_name]))
     
-    logger.info(f"Created lookup with {len(lookup)} unique drug names")
+    logger.info("Created lookup with %d unique drug names", len(lookup))
     return lookup
 
 
-def match_drugs_to_approval_status(drug_names: List[str], openfda_df: pd.DataFrame) -> pd.DataFrame:
+def _approval_lookup(openfda_df: pd.DataFrame) -> Tuple[Dict[str, str], pd.Index, pd.Categorical]:
+    """
+    Get the approval lookup for an OpenFDA DataFrame, building it on first use.
+    
+    The lookup is cached per DataFrame object until that object is garbage collected,
+    so openfda_df must not be modified after it has been matched against.
+    
+    Args:
+        openfda_df: DataFrame from parse_openfda_bulk_data
+        
+    Returns:
+        Tuple of (name to status dict, index of the names, status per name as a Categorical)
+    """
+    key = id(openfda_df)
+    if key not in _lookup_cache:
+        lookup = create_drug_approval_lookup(openfda_df)
+        _lookup_cache[key] = (lookup, pd.Index(list(lookup)), pd.Categorical(list(lookup.values())))
+        weakref.finalize(openfda_df, _lookup_cache.pop, key, None)
+    return _lookup_cache[key]
+
+
+def match_drugs_to_approval_status(drug_names: Union[pd.Series, List[str]], openfda_df: pd.DataFrame) -> pd.DataFrame:
     """
     Match a list of drug names to their approval status from OpenFDA data.
     
     Args:
-        drug_names: List of drug names to match
+        drug_names: Series or list of drug names to match
         openfda_df: DataFrame from parse_openfda_bulk_data
         
     Returns:
         DataFrame with columns: ['drug_name', 'approval_status', 'matched_name']
     """
-    logger.info(f"Matching {len(drug_names)} drugs to OpenFDA approval status...")
+    logger.info("Matching %d drugs to OpenFDA approval status...", len(drug_names))
+    
+    # Create lookup (reused across calls with the same openfda_df)
+    lookup, lookup_index, statuses = _approval_lookup(openfda_df)
+    # The trailing -1 code is what an unmatched (-1) position selects
+    status_codes = np.append(statuses.codes, np.int8(-1))
+    
+    names = pd.Series(drug_names, dtype=object)
+    names = names[names.notna() & names.ne('')].reset_index(drop=True)
+    df = pd.DataFrame({
+        'drug_name': names,
+        'key': names.str.lower(),
+        'normalized': normalize_series(names)
+    })
     
-    # Create lookup
-    lookup = create_drug_approval_lookup(openfda_df)
+    # Try exact match on the lowercased name first, then on the normalized name
+    position = lookup_index.get_indexer(df['key'])
+    position = np.where(position >= 0, position, lookup_index.get_indexer(df['normalized']))
+    df['approval_status'] = pd.Categorical.from_codes(
+        status_codes[position], statuses.categories
+    ).astype(object)
+    df['matched_name'] = df['drug_name'].where(df['approval_status'].notna())
     
-    results = []
-    matched_count = 0
+    # Fall back to fuzzy token matching on the normalized name
+    unmatched = df.index[df['approval_status'].isna()]
+    if len(unmatched):
+        fuzzy = _fuzzy_matches(df.loc[unmatched, 'normalized'], lookup)
+        for i, openfda_name in fuzzy.items():
+            df.at[i, 'approval_status'] = lookup[openfda_name]
+            df.at[i, 'matched_name'] = openfda_name
     
-    for drug_name in drug_names:
-        if not drug_name:
-            continue
-            
-        # Try exact match first
-        normalized = normalize_drug_name(drug_name)
-        approval_status = None
-        matched_name = None
+    matched_count = int(df['approval_status'].notna().sum())
+    df['approval_status'] = df['approval_status'].fillna('not_found')
+    df['matched_name'] = df['matched_name'].fillna(df['drug_name'])
+    df = df[['drug_name', 'approval_status', 'matched_name']]
+    logger.info("Matched %d/%d drugs to approval status", matched_count, len(drug_names))
+    
+    return df
+
+
+def _fuzzy_matches(queries: pd.Series, lookup: Dict[str, str]) -> Dict[int, str]:
+    """
+    Find, for each query, the best lookup name by token set similarity.
+    
+    Queries are scored against all lookup names in batched process.cdist calls;
+    ties go to the earliest lookup name, as with process.extractOne.
+    
+    Args:
+        queries: Series of normalized drug names
+        lookup: Drug name to approval status lookup
         
-        # Try multiple matching strategies
-        if drug_name.lower() in lookup:
-            approval_status = lookup[drug_name.lower()]
-            matched_name = drug_name
-        elif normalized in lookup:
-            approval_status = lookup[normalized]
-            matched_name = drug_name
-        else:
-            # Try partial matching
-            for openfda_name, status in lookup.items():
-                if (drug_name.lower() in openfda_name or 
-                    openfda_name in drug_name.lower() or
-                    normalized in openfda_name or 
-                    openfda_name in normalized):
-                    approval_status = status
-                    matched_name = openfda_name
-                    break
+    Returns:
+        Dictionary mapping query index to the matched lookup name (scores >= FUZZY_MATCH_CUTOFF only)
+    """
+    if not lookup:
+        return {}
+    
+    queries = queries[queries.notna() & queries.ne('')]
+    choices = list(lookup)
+    # Bound each score matrix to about FUZZY_BATCH_CELLS float32 cells
+    batch_size = max(1, FUZZY_BATCH_CELLS // len(choices))
+    matches: Dict[int, str] = {}
+    for start in range(0, len(queries), batch_size):
+        batch = queries.iloc[start:start + batch_size]
+        scores = process.cdist(batch.tolist(), choices, scorer=fuzz.token_set_ratio,
+                               score_cutoff=FUZZY_MATCH_CUTOFF, dtype=np.float32, workers=-1)
+        best = scores.argmax(axis=1)
+        found = scores[np.arange(len(batch)), best] >= FUZZY_MATCH_CUTOFF
+        matches.update(zip(batch.index[found], (choices[j] for j in best[found])))
+    return matches
+
+
+def parse_openfda_bulk_files(json_paths: List[Path]) -> pd.DataFrame:
+    """
+    Parse one or more OpenFDA bulk data shards, one worker process per shard.
+    
+    Args:
+        json_paths: Paths to the OpenFDA JSON shards, in order
         
-        if approval_status:
-            matched_count += 1
-        else:
-            approval_status = 'not_found'
-            matched_name = drug_name
+    Returns:
+        Concatenated DataFrame in the format of parse_openfda_bulk_data
+    """
+    if len(json_paths) == 1:
+        return parse_openfda_bulk_data(str(json_paths[0]))
+    
+    logger.info("Parsing %d OpenFDA shards in parallel...", len(json_paths))
+    # Spawned workers: this runs on an ETL thread next to other pyarrow/pandas work, and forking
+    # a multithreaded process can deadlock
+    with ProcessPoolExecutor(max_workers=min(len(json_paths), os.cpu_count() or 1),
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        shard_dfs = list(executor.map(parse_openfda_bulk_data, map(str, json_paths)))
+    
+    # Shards have different marketing_status categories, so restore the dtypes after concatenating
+    return pd.concat(shard_dfs, ignore_index=True).astype(OPENFDA_DTYPES)
+
+
+def load_openfda_lookup(json_paths: Union[Path, List[Path]] = OPENFDA_JSON_PATH,
+                        cache_path: Path = OPENFDA_LOOKUP_PATH) -> pd.DataFrame:
+    """
+    Load the columns needed for approval matching, parsing the bulk JSON only when the cache
+    was built from a different version of the files (by mtime and size).
+    
+    Args:
+        json_paths: Path, or list of shard paths, of the OpenFDA JSON data
+        cache_path: Path to the Parquet lookup cache
         
-        results.append({
-            'drug_name': drug_name,
-            'approval_status': approval_status,
-            'matched_name': matched_name
-        })
+    Returns:
+        DataFrame with columns: ['drug_name', 'normalized_name', 'approval_status']
+    """
+    if isinstance(json_paths, Path):
+        json_paths = [json_paths]
     
-    df = pd.DataFrame(results)
-    logger.info(f"Matched {matched_count}/{len(drug_names)} drugs to approval status")
+    # The cache is valid only for the exact source files it was built from
+    source_key = ';'.join(
+        f"{path.name}:{stat.st_mtime_ns}_{stat.st_size}"
+        for path, stat in ((path, path.stat()) for path in json_paths)
+    ).encode()
+    if cache_path.exists() and (pq.read_schema(cache_path).metadata or {}).get(CACHE_KEY_FIELD) == source_key:
+        logger.info("Loading OpenFDA lookup from cache %s", cache_path)
+        return pq.read_table(cache_path, columns=LOOKUP_COLUMNS).to_pandas()
     
-    return df
+    openfda_df = parse_openfda_bulk_files(json_paths)
+    
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(openfda_df, preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, CACHE_KEY_FIELD: source_key})
+    pq.write_table(table, cache_path, **PARQUET_WRITE_OPTIONS)
+    logger.info("Cached OpenFDA lookup to %s", cache_path)
+    
+    return openfda_df[LOOKUP_COLUMNS]
+
+
+def find_openfda_shards(raw_dir: Path = OPENFDA_JSON_PATH.parent) -> List[Path]:
+    """
+    Find the OpenFDA bulk data shards (drug-drugsfda-NNNN-of-NNNN.json) to parse.
+    
+    Shards are grouped by their -of-NNNN total so a stale download is never mixed with a
+    newer one; of the complete sets, the most recently modified is used.
+    
+    Args:
+        raw_dir: Directory holding the downloaded shards
+        
+    Returns:
+        Shard paths in shard order, or an empty list when no set is complete
+    """
+    shard_sets: Dict[int, Dict[int, Path]] = defaultdict(dict)
+    for path in raw_dir.glob(OPENFDA_SHARD_PATTERN):
+        match = OPENFDA_SHARD_RE.fullmatch(path.name)
+        if match:
+            shard_sets[int(match[2])][int(match[1])] = path
+    
+    complete = {
+        total: [shards[n] for n in range(1, total + 1)]
+        for total, shards in shard_sets.items() if set(shards) == set(range(1, total + 1))
+    }
+    for total in shard_sets.keys() - complete.keys():
+        logger.warning("Ignoring incomplete set of OpenFDA shards (%d of %d present)",
+                       len(shard_sets[total]), total)
+    if not complete:
+        return []
+    
+    total = max(complete, key=lambda t: max(path.stat().st_mtime for path in complete[t]))
+    if len(complete) > 1:
+        logger.warning("Found %d sets of OpenFDA shards; using the newest (%d shards)", len(complete), total)
+    return complete[total]
 
 
-def fetch_openfda_approval_status(drug_names: List[str]) -> pd.DataFrame:
+def fetch_openfda_approval_status(drug_names: Union[pd.Series, List[str]]) -> pd.DataFrame:
     """
     Fetch approval status for drugs using bulk OpenFDA data.
     
     Args:
-        drug_names: List of drug names to match
+        drug_names: Series or list of drug names to match
         
     Returns:
         DataFrame with columns: ['drug_name', 'approval_status']
     """
-    # Path to the OpenFDA JSON file
-    json_path = Path("data/raw/drug-drugsfda-0001-of-0001.json")
+    # OpenFDA publishes the bulk data as drug-drugsfda-NNNN-of-NNNN.json shards
+    json_paths = find_openfda_shards()
     
-    if not json_path.exists():
-        logger.error(f"OpenFDA JSON file not found at {json_path}")
+    if not json_paths:
+        logger.error("No complete set of OpenFDA %s shards found in %s",
+                     OPENFDA_SHARD_PATTERN, OPENFDA_JSON_PATH.parent)
         # Return empty DataFrame with expected columns
-        return pd.DataFrame({'drug_name': drug_names, 'approval_status': ['not_found'] * len(drug_names)})
+        return pd.DataFrame({'drug_name': list(drug_names), 'approval_status': 'not_found'})
     
-    # Parse bulk data
-    openfda_df = parse_openfda_bulk_data(str(json_path))
+    # Parse bulk data (or reuse the cached lookup table)
+    openfda_df = load_openfda_lookup(json_paths)
     
     # Match drugs to approval status
     result_df = match_drugs_to_approval_status(drug_names, openfda_df)
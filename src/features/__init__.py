@@ -9,12 +9,13 @@ This module contains the components for computing DILI risk scores:
 
 from .dili_risk_scorer import DILIRiskScorer
 from .direct_evidence import DirectEvidenceComputer
-from .network_scorer import NetworkScorer
+from .network_scorer import NetworkScorer, load_network
 from .risk_calculator import RiskCalculator
 
 __all__ = [
     'DILIRiskScorer',
     'DirectEvidenceComputer', 
     'NetworkScorer',
-    'RiskCalculator'
+    'RiskCalculator',
+    'load_network'
 ] 
\ No newline at end of file
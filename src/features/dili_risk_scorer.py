@@ -6,12 +6,15 @@ for each target to create a simple, interpretable risk score.
 """
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import logging
 from pathlib import Path
 from typing import Dict, Optional
 
+from utils.parquet_io import PARQUET_WRITE_OPTIONS
 from .direct_evidence import DirectEvidenceComputer
-from .network_scorer import NetworkScorer
+from .network_scorer import NetworkScorer, load_network
 from .risk_calculator import RiskCalculator
 
 logger = logging.getLogger(__name__)
@@ -55,7 +58,7 @@ class DILIRiskScorer:
         
         # Load target network
         network_path = self.processed_dir / "target_network.parquet"
-        network_df = pd.read_parquet(network_path) if network_path.exists() else pd.DataFrame()
+        network_df = load_network(network_path) if network_path.exists() else pd.DataFrame()
         
         # Compute direct DILI evidence
         direct_evidence = self.direct_evidence_computer.compute_direct_dili_evidence(drug_target_df)
@@ -70,7 +73,13 @@ class DILIRiskScorer:
         output_path = self.processed_dir / "dili_risk_scores.parquet"
         # Reset index to include target symbols as a column
         final_scores = final_scores.reset_index()
-        final_scores.to_parquet(output_path, index=False)
+        table = pa.Table.from_pandas(final_scores, preserve_index=False)
+        pq.write_table(
+            table, output_path, **{
+                **PARQUET_WRITE_OPTIONS,
+                'use_dictionary': [col for col in ['target_symbol', 'risk_category'] if col in table.column_names]
+            }
+        )
         logger.info(f"Saved DILI risk scores to {output_path}")
         
         return final_scores 
\ No newline at end of file
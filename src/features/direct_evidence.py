@@ -5,6 +5,7 @@ Computes direct DILI evidence for each target based on drug-target associations
 and FDA DILIrank data.
 """
 
+import numpy as np
 import pandas as pd
 import logging
 
@@ -27,37 +28,36 @@ class DirectEvidenceComputer:
         
         # Deduplicate drug-target pairs to prevent inflated weights
         # Keep the first occurrence of each unique drug-target pair
-        drug_target_dedup = drug_target_df.drop_duplicates(
-            subset=['fda_drug_name', 'target_symbol'], 
-            keep='first'
-        )
-        
-        logger.info(f"Deduplicated from {len(drug_target_df)} to {len(drug_target_dedup)} unique drug-target pairs")
-        
-        # Aggregate DILI evidence per target
-        direct_evidence = drug_target_dedup.groupby('target_symbol').agg({
-            'fda_drug_name': 'nunique',  # Number of unique drugs targeting this target
-            'dili_severity_weight': 'sum',  # Sum of DILI severity weights (now from unique drugs only)
-        }).rename(columns={
-            'fda_drug_name': 'drug_count',
-            'dili_severity_weight': 'total_dili_weight',
+        # (hashing integer category codes rather than the name strings; missing names share code -1)
+        pair_codes = pd.DataFrame({
+            'drug': drug_target_df['fda_drug_name'].astype('category').cat.codes.to_numpy(),
+            'target': drug_target_df['target_symbol'].astype('category').cat.codes.to_numpy()
         })
+        drug_target_dedup = drug_target_df[~pair_codes.duplicated(keep='first').to_numpy()]
         
-        # Calculate high-risk drug count (unique drugs that are high-risk)
-        high_risk_counts = drug_target_dedup[
-            drug_target_dedup['fda_dili_concern'] == 'Most-DILI-Concern'
-        ].groupby('target_symbol')['fda_drug_name'].nunique()
+        logger.info(f"Deduplicated from {len(drug_target_df)} to {len(drug_target_dedup)} unique drug-target pairs")
         
-        direct_evidence['high_risk_drug_count'] = high_risk_counts.fillna(0)
+        # Aggregate DILI evidence per target in a single groupby; after deduplication each
+        # high-risk row with a drug name is a distinct high-risk drug for its target
+        drug_target_dedup = drug_target_dedup.assign(
+            is_high_risk=drug_target_dedup['fda_dili_concern'].eq('Most-DILI-Concern')
+            & drug_target_dedup['fda_drug_name'].notna()
+        )
+        direct_evidence = drug_target_dedup.groupby('target_symbol').agg(
+            drug_count=('fda_drug_name', 'nunique'),  # Number of unique drugs targeting this target
+            total_dili_weight=('dili_severity_weight', 'sum'),  # Sum of DILI severity weights (unique drugs only)
+            high_risk_drug_count=('is_high_risk', 'sum'),  # Unique drugs that are high-risk
+        )
         
         # Add derived features
-        direct_evidence['dili_risk_ratio'] = (
-            direct_evidence['high_risk_drug_count'] / direct_evidence['drug_count']
-        ).fillna(0)
-        
-        direct_evidence['avg_dili_weight'] = (
-            direct_evidence['total_dili_weight'] / direct_evidence['drug_count']
-        ).fillna(0)
+        has_drugs = direct_evidence['drug_count'].to_numpy() > 0
+        drug_count = np.where(has_drugs, direct_evidence['drug_count'].to_numpy(), 1)
+        direct_evidence['dili_risk_ratio'] = np.where(
+            has_drugs, direct_evidence['high_risk_drug_count'].to_numpy() / drug_count, 0.0
+        )
+        direct_evidence['avg_dili_weight'] = np.where(
+            has_drugs, direct_evidence['total_dili_weight'].to_numpy() / drug_count, 0.0
+        )
         
         logger.info(f"Computed direct DILI evidence for {len(direct_evidence)} targets")
         return direct_evidence 
\ No newline at end of file
@@ -6,14 +6,69 @@ from target-target network data.
 """
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import logging
+from functools import lru_cache
+from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# The only target network columns used for guilt-by-association
+NETWORK_SCORE_COLUMNS = ['target1', 'n_risk_targets']
+
+
+def load_network(path: Path) -> pd.DataFrame:
+    """Load the target network, reading only the columns NetworkScorer needs.
+    
+    Args:
+        path: Path to target_network.parquet
+        
+    Returns:
+        DataFrame with columns: ['target1', 'n_risk_targets']
+    """
+    return pd.read_parquet(path, columns=NETWORK_SCORE_COLUMNS)
+
+
+@lru_cache(maxsize=4)
+def _load_mapping(path: str, mtime: float) -> pd.DataFrame:
+    """Load the gene symbol to Pathway Commons target mapping, cached per file version.
+    
+    Args:
+        path: Path to target_mapping.parquet
+        mtime: Modification time of the file (part of the cache key)
+        
+    Returns:
+        DataFrame with columns: ['gene_symbol', 'pc_target'] (shared; do not modify)
+    """
+    return pd.read_parquet(path, columns=['gene_symbol', 'pc_target'])
+
 
 class NetworkScorer:
     """Computes network guilt-by-association for each target."""
     
+    @staticmethod
+    def _sum_by_pc_target(network_df: pd.DataFrame) -> pd.Series:
+        """Sum n_risk_targets per Pathway Commons target.
+        
+        Runs on Arrow's multithreaded hash aggregation, which avoids pandas'
+        object-string factorization of the network's target1 column.
+        
+        Args:
+            network_df: Target-target network data
+            
+        Returns:
+            Series of summed n_risk_targets indexed by target1
+        """
+        network_table = pa.Table.from_pandas(network_df[NETWORK_SCORE_COLUMNS], preserve_index=False)
+        # Match pandas groupby, which drops missing keys and sums all-missing groups to 0
+        network_table = network_table.filter(pc.is_valid(network_table.column('target1')))
+        sums = network_table.group_by('target1', use_threads=True).aggregate([('n_risk_targets', 'sum')])
+        return pd.Series(
+            pc.fill_null(sums.column('n_risk_targets_sum'), 0).to_numpy(),
+            index=sums.column('target1').to_pandas()
+        )
+    
     def compute_network_guilt_by_association(self, 
                                            direct_evidence: pd.DataFrame,
                                            network_df: pd.DataFrame) -> pd.DataFrame:
@@ -21,7 +76,7 @@ class NetworkScorer:
         
         Args:
             direct_evidence: Direct DILI evidence per target
-            network_df: Target-target network data
+            network_df: Target-target network data (only target1 and n_risk_targets are used)
             
         Returns:
             DataFrame with network guilt-by-association scores
@@ -35,7 +90,6 @@ class NetworkScorer:
             return network_scores
         
         # Load target mapping to connect OpenTargets to Pathway Commons
-        from pathlib import Path
         mapping_path = Path("data/processed/target_mapping.parquet")
         
         if not mapping_path.exists():
@@ -44,38 +98,21 @@ class NetworkScorer:
             network_scores['network_dili_score'] = 0
             return network_scores
         
-        mapping_df = pd.read_parquet(mapping_path)
+        mapping_df = _load_mapping(str(mapping_path), mapping_path.stat().st_mtime)
         logger.info(f"Loaded target mapping with {len(mapping_df)} gene symbol mappings")
         
-        # For each target, find its network neighbors and sum their DILI evidence
-        network_scores = []
-        
-        for target in direct_evidence.index:
-            # Find Pathway Commons targets that contain this gene symbol
-            pc_targets = mapping_df[mapping_df['gene_symbol'] == target]['pc_target'].unique()
-            
-            if len(pc_targets) > 0:
-                # Get the network data for these Pathway Commons targets
-                target_network = network_df[network_df['target1'].isin(pc_targets)]
-                
-                if not target_network.empty:
-                    # Sum the n_risk_targets as a proxy for network guilt-by-association
-                    neighbor_dili_score = target_network['n_risk_targets'].sum()
-                else:
-                    neighbor_dili_score = 0
-            else:
-                neighbor_dili_score = 0
-            
-            network_scores.append({
-                'target_symbol': target,
-                'network_dili_score': neighbor_dili_score
-            })
-        
-        network_df_scores = pd.DataFrame(network_scores).set_index('target_symbol')
+        # Sum the n_risk_targets of each Pathway Commons target as a proxy for network
+        # guilt-by-association, then total it over the PC targets containing each gene symbol
+        pc_scores = self._sum_by_pc_target(network_df)
+        gene_pc_targets = mapping_df[['gene_symbol', 'pc_target']].drop_duplicates()
+        gene_scores = (
+            gene_pc_targets['pc_target'].map(pc_scores).fillna(0)
+            .groupby(gene_pc_targets['gene_symbol'], sort=False).sum()
+        )
         
-        # Merge with direct evidence
-        combined_scores = direct_evidence.merge(network_df_scores, left_index=True, right_index=True, how='left')
-        combined_scores['network_dili_score'] = combined_scores['network_dili_score'].fillna(0)
+        combined_scores = direct_evidence.assign(
+            network_dili_score=gene_scores.reindex(direct_evidence.index, fill_value=0).to_numpy()
+        )
         
         # Log some statistics
         non_zero_network = combined_scores[combined_scores['network_dili_score'] > 0]
@@ -5,11 +5,46 @@ Computes final DILI risk scores by combining direct and network evidence,
 and assigns risk categories.
 """
 
+import numpy as np
 import pandas as pd
 import logging
 
 logger = logging.getLogger(__name__)
 
+RISK_CATEGORIES = ['Low', 'Medium', 'High']
+
+
+def risk_category_codes(scores: np.ndarray) -> np.ndarray:
+    """Assign tertile risk category codes (0=Low, 1=Medium, 2=High, -1=missing).
+    
+    Bins are right-closed like pd.qcut. When tied scores make tertile edges coincide,
+    falls back to three equal-width bins over the score range, like pd.cut.
+    
+    Args:
+        scores: Risk scores
+        
+    Returns:
+        Array of int8 category codes
+    """
+    codes = np.full(len(scores), -1, dtype=np.int8)
+    valid = ~np.isnan(scores)
+    if not valid.any():
+        return codes
+    
+    values = scores[valid]
+    # Same percentile computation as pd.qcut, so scores sitting on an edge bin identically
+    edges = np.percentile(values, np.linspace(0, 1, 4) * 100)
+    if not np.all(np.diff(edges) > 0):
+        low, high = values.min(), values.max()
+        if low == high:
+            # pd.cut widens a zero range around the value, which lands in the middle bin
+            codes[valid] = 1
+            return codes
+        edges = np.linspace(low, high, 4)
+    
+    codes[valid] = np.searchsorted(edges[1:-1], values, side='left')
+    return codes
+
 
 class RiskCalculator:
     """Computes final DILI risk scores and categories."""
@@ -36,13 +71,14 @@ class RiskCalculator:
         # Normalize features to [0,1] range
         features_to_normalize = ['total_dili_weight', 'high_risk_drug_count', 'network_dili_score']
 
-        for feature in features_to_normalize:
-            if feature in combined_scores.columns:
-                max_val = combined_scores[feature].max()
-                if max_val > 0:
-                    combined_scores[f'{feature}_normalized'] = combined_scores[feature] / max_val
-                else:
-                    combined_scores[f'{feature}_normalized'] = 0
+        features = [feature for feature in features_to_normalize if feature in combined_scores.columns]
+        
+        # Divide all features by their column maxima in one pass (features with no positive max become 0)
+        values = combined_scores[features].to_numpy(dtype=float)
+        max_vals = np.nanmax(values, axis=0, initial=-np.inf) if len(values) else np.zeros(len(features))
+        has_max = max_vals > 0
+        normalized = np.where(has_max, values / np.where(has_max, max_vals, 1.0), 0.0)
+        combined_scores[[f'{feature}_normalized' for feature in features]] = normalized
         
         # Compute final risk score: direct evidence + alpha * network evidence
         combined_scores['dili_risk_score'] = (
@@ -56,21 +92,10 @@ class RiskCalculator:
             combined_scores['dili_risk_score'] = combined_scores['dili_risk_score'] / max_score
         
         # Add risk categories with equal distribution (tertiles)
-        try:
-            combined_scores['risk_category'] = pd.qcut(
-                combined_scores['dili_risk_score'],
-                q=3,
-                labels=['Low', 'Medium', 'High'],
-                duplicates='drop'
-            )
-        except ValueError:
-            # Fallback to cut if qcut fails due to duplicate values
-            combined_scores['risk_category'] = pd.cut(
-                combined_scores['dili_risk_score'],
-                bins=3,
-                labels=['Low', 'Medium', 'High'],
-                include_lowest=True
-            )
+        combined_scores['risk_category'] = pd.Categorical.from_codes(
+            risk_category_codes(combined_scores['dili_risk_score'].to_numpy(dtype=float)),
+            categories=RISK_CATEGORIES, ordered=True
+        )
         
         logger.info(f"Computed final risk scores for {len(combined_scores)} targets")
         logger.info(f"Risk score range: {combined_scores['dili_risk_score'].min():.3f} - {combined_scores['dili_risk_score'].max():.3f}")
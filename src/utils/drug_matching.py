@@ -7,15 +7,40 @@ between FDA DILIrank and OpenTargets datasets.
 
 import re
 import logging
+import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Optional
 from difflib import SequenceMatcher
-import multiprocessing as mp
-from functools import partial
+from functools import lru_cache
+
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:  # rapidfuzz is optional; fall back to difflib
+    fuzz = process = None
 
 logger = logging.getLogger(__name__)
 
+# Normalized names whose lengths differ by more than this are never fuzzy-matched
+MAX_LENGTH_DIFF = 5
+
+# Common drug suffixes and salts stripped during normalization
+_SUFFIX_RE = re.compile(
+    r'\b(hcl|hydrochloride|sulfate|citrate|phosphate|acetate|sodium|potassium|calcium|magnesium'
+    r'|monohydrate|dihydrate|trihydrate|hemihydrate|sesquihydrate)\b'
+)
+_WS_RE = re.compile(r'\s+')
+_PUNCT_RE = re.compile(r'[^\w\s]')
+
+# DILI severity weights by FDA DILIrank concern
+SEVERITY_WEIGHTS = pd.Series({
+    'Most-DILI-Concern': 2.0,
+    'Less-DILI-Concern': 1.0,
+    'No-DILI-Concern': 0.0,
+    'Ambiguous-DILI-Concern': 0.5
+})
 
+
+@lru_cache(maxsize=200_000)
 def normalize_drug_name(name: str) -> str:
     """Normalize drug name for matching.
     
@@ -32,20 +57,11 @@ def normalize_drug_name(name: str) -> str:
     normalized = name.lower().strip()
     
     # Remove common drug suffixes and salts
-    suffixes = [
-        r'\b(hcl|hydrochloride|sulfate|citrate|phosphate|acetate|sodium|potassium|calcium|magnesium)\b',
-        r'\b(hydrochloride|sulfate|citrate|phosphate|acetate)\b',
-        r'\b(sodium|potassium|calcium|magnesium)\b',
-        r'\b(monohydrate|dihydrate|trihydrate)\b',
-        r'\b(hemihydrate|sesquihydrate)\b'
-    ]
-    
-    for suffix in suffixes:
-        normalized = re.sub(suffix, '', normalized)
+    normalized = _SUFFIX_RE.sub('', normalized)
     
     # Remove extra spaces and punctuation
-    normalized = re.sub(r'\s+', ' ', normalized)
-    normalized = re.sub(r'[^\w\s]', '', normalized)
+    normalized = _WS_RE.sub(' ', normalized)
+    normalized = _PUNCT_RE.sub('', normalized)
     normalized = normalized.strip()
     
     return normalized
@@ -111,154 +127,102 @@ def fuzzy_match_drug_names(drug1: str, drug2: str, threshold: float = 0.8) -> fl
     return similarity
 
 
-def match_fda_to_opentargets_drugs_parallel(fda_drugs: List[str], ot_drugs: List[str], 
-                                           threshold: float = 0.8, n_jobs: int = -1) -> Dict[str, str]:
-    """Match FDA DILIrank drug names to OpenTargets drug names using parallel processing.
+def match_fda_to_opentargets_drugs(fda_drugs: List[str], ot_drugs: List[str], 
+                                  threshold: float = 0.8, use_parallel: bool = False) -> Dict[str, str]:
+    """Match FDA DILIrank drug names to OpenTargets drug names.
     
     Args:
         fda_drugs: List of FDA DILIrank drug names
         ot_drugs: List of OpenTargets drug names
         threshold: Minimum similarity threshold for matching
-        n_jobs: Number of parallel jobs (-1 for all CPUs)
+        use_parallel: Unused; the RapidFuzz fuzzy pass already runs on all cores
         
     Returns:
         Dictionary mapping FDA drug names to OpenTargets drug names
     """
-    logger.info(f"Matching {len(fda_drugs)} FDA drugs to {len(ot_drugs)} OpenTargets drugs (parallel)")
-    
-    # Pre-compute all OpenTargets drug variations for fast lookup
-    logger.info("Pre-computing OpenTargets drug variations...")
-    ot_variations_dict = {}
-    ot_normalized_dict = {}
-    
-    for ot_drug in ot_drugs:
-        variations = create_drug_name_variations(ot_drug)
-        normalized = normalize_drug_name(ot_drug)
-        
-        # Store all variations
-        for var in variations:
-            ot_variations_dict[var.lower()] = ot_drug
-            ot_normalized_dict[normalized] = ot_drug
-    
-    # Process in parallel using a simpler approach
-    logger.info(f"Processing with {n_jobs} parallel jobs...")
-    
-    # Split FDA drugs into chunks for parallel processing
-    chunk_size = max(1, len(fda_drugs) // n_jobs)
-    fda_chunks = [fda_drugs[i:i + chunk_size] for i in range(0, len(fda_drugs), chunk_size)]
-    
-    def process_chunk(fda_chunk: List[str]) -> List[Tuple[str, str, float]]:
-        """Process a chunk of FDA drugs."""
-        results = []
-        for fda_drug in fda_chunk:
-            best_match = None
-            best_score = 0.0
-            
-            # Create variations of FDA drug name
-            fda_variations = create_drug_name_variations(fda_drug)
-            fda_normalized = normalize_drug_name(fda_drug)
-            
-            # First, try exact matches (fastest)
-            for fda_var in fda_variations:
-                if fda_var.lower() in ot_variations_dict:
-                    best_match = ot_variations_dict[fda_var.lower()]
-                    best_score = 1.0
-                    break
-            
-            # If no exact match, try normalized exact match
-            if best_score == 0.0 and fda_normalized in ot_normalized_dict:
-                best_match = ot_normalized_dict[fda_normalized]
-                best_score = 1.0
-            
-            # If still no match, try fuzzy matching (slower)
-            if best_score == 0.0:
-                for ot_drug in ot_drugs:
-                    # Skip if we already have a perfect match
-                    if best_score >= 0.99:
-                        break
-                        
-                    ot_normalized = normalize_drug_name(ot_drug)
-                    
-                    # Quick check: if normalized names are very different, skip
-                    if abs(len(fda_normalized) - len(ot_normalized)) > 5:
-                        continue
-                    
-                    # Calculate similarity
-                    similarity = SequenceMatcher(None, fda_normalized, ot_normalized).ratio()
-                    
-                    if similarity > best_score:
-                        best_score = similarity
-                        best_match = ot_drug
-                        
-                        # Early termination for very good matches
-                        if similarity >= 0.95:
-                            break
-            
-            results.append((fda_drug, best_match, best_score))
-        
-        return results
-    
-    # Set number of jobs
-    if n_jobs == -1:
-        n_jobs = mp.cpu_count()
-    
-    # Process in parallel
-    with mp.Pool(n_jobs) as pool:
-        chunk_results = pool.map(process_chunk, fda_chunks)
-    
-    # Flatten results
-    results = []
-    for chunk_result in chunk_results:
-        results.extend(chunk_result)
-    
-    # Collect results
-    matches = {}
-    matched_count = 0
-    exact_matches = 0
-    fuzzy_matches = 0
-    
-    for fda_drug, best_match, best_score in results:
-        if best_score >= threshold:
-            matches[fda_drug] = best_match
-            matched_count += 1
-            if best_score == 1.0:
-                exact_matches += 1
-            else:
-                fuzzy_matches += 1
-        else:
-            logger.debug(f"No match found for '{fda_drug}' (best score: {best_score:.3f})")
-    
-    logger.info(f"Matched {matched_count}/{len(fda_drugs)} FDA drugs to OpenTargets drugs")
-    logger.info(f"  Exact matches: {exact_matches}")
-    logger.info(f"  Fuzzy matches: {fuzzy_matches}")
-    return matches
+    return match_fda_to_opentargets_drugs_serial(fda_drugs, ot_drugs, threshold)
 
 
-def match_fda_to_opentargets_drugs(fda_drugs: List[str], ot_drugs: List[str], 
-                                  threshold: float = 0.8, use_parallel: bool = False) -> Dict[str, str]:
-    """Match FDA DILIrank drug names to OpenTargets drug names.
+def fuzzy_best_matches(queries: List[str], choices: List[str],
+                       threshold: float = 0.8, workers: int = -1) -> List[Tuple[Optional[int], float]]:
+    """Find the most similar choice for each query name.
+    
+    Uses RapidFuzz's native cdist when available, otherwise SequenceMatcher.
     
     Args:
-        fda_drugs: List of FDA DILIrank drug names
-        ot_drugs: List of OpenTargets drug names
+        queries: Normalized names to match
+        choices: Normalized candidate names
         threshold: Minimum similarity threshold for matching
-        use_parallel: Whether to use parallel processing (disabled for now)
+        workers: Number of threads for RapidFuzz (-1 for all CPUs)
         
     Returns:
-        Dictionary mapping FDA drug names to OpenTargets drug names
+        List of (index into choices or None, similarity score 0-1) per query
     """
-    # Use optimized serial version for now
-    return match_fda_to_opentargets_drugs_serial(fda_drugs, ot_drugs, threshold)
+    results: List[Tuple[Optional[int], float]] = [(None, 0.0)] * len(queries)
+    if len(queries) == 0 or len(choices) == 0:
+        return results
+    
+    # Index choices by normalized length so each query only sees choices within
+    # MAX_LENGTH_DIFF of its own length
+    choice_lens = np.fromiter(map(len, choices), dtype=np.int32, count=len(choices))
+    length_order = np.argsort(choice_lens, kind='stable')
+    sorted_lens = choice_lens[length_order]
+    
+    def length_candidates(length: int) -> np.ndarray:
+        lo, hi = np.searchsorted(sorted_lens, [length - MAX_LENGTH_DIFF, length + MAX_LENGTH_DIFF + 1])
+        return np.sort(length_order[lo:hi])
+    
+    if process is not None:
+        query_lens = np.fromiter(map(len, queries), dtype=np.int32, count=len(queries))
+        for length in np.unique(query_lens).tolist():
+            candidates = length_candidates(length)
+            if len(candidates) == 0:
+                continue
+            query_idx = np.flatnonzero(query_lens == length)
+            # Score this length group against its candidates in C++ across all cores
+            scores = process.cdist([queries[q] for q in query_idx.tolist()],
+                                   [choices[c] for c in candidates.tolist()],
+                                   scorer=fuzz.ratio, score_cutoff=threshold * 100,
+                                   dtype=np.float32, workers=workers)
+            best_idx = scores.argmax(axis=1)
+            best_scores = scores[np.arange(len(query_idx)), best_idx] / 100
+            for q, idx, score in zip(query_idx.tolist(), candidates[best_idx].tolist(), best_scores.tolist()):
+                if score > 0:
+                    results[q] = (idx, score)
+        return results
+    
+    results = []
+    for query in queries:
+        best_idx = None
+        best_score = 0.0
+        for idx in length_candidates(len(query)).tolist():
+            # Skip if we already have a perfect match
+            if best_score >= 0.99:
+                break
+            
+            # Calculate similarity
+            similarity = SequenceMatcher(None, query, choices[idx]).ratio()
+            
+            if similarity > best_score:
+                best_score = similarity
+                best_idx = idx
+                
+                # Early termination for very good matches
+                if similarity >= 0.95:
+                    break
+        results.append((best_idx, best_score))
+    return results
 
 
 def match_fda_to_opentargets_drugs_serial(fda_drugs: List[str], ot_drugs: List[str], 
-                                         threshold: float = 0.8) -> Dict[str, str]:
+                                         threshold: float = 0.8, workers: int = -1) -> Dict[str, str]:
     """Match FDA DILIrank drug names to OpenTargets drug names.
     
     Args:
         fda_drugs: List of FDA DILIrank drug names
         ot_drugs: List of OpenTargets drug names
         threshold: Minimum similarity threshold for matching
+        workers: Number of threads for the RapidFuzz fuzzy pass (-1 for all CPUs)
         
     Returns:
         Dictionary mapping FDA drug names to OpenTargets drug names
@@ -269,74 +233,54 @@ def match_fda_to_opentargets_drugs_serial(fda_drugs: List[str], ot_drugs: List[s
     logger.info("Pre-computing OpenTargets drug variations...")
     ot_variations_dict = {}
     ot_normalized_dict = {}
+    ot_normalized_list = []
     
     for ot_drug in ot_drugs:
         variations = create_drug_name_variations(ot_drug)
         normalized = normalize_drug_name(ot_drug)
+        ot_normalized_list.append(normalized)
+        ot_normalized_dict[normalized] = ot_drug
         
         # Store all variations
         for var in variations:
             ot_variations_dict[var.lower()] = ot_drug
-            ot_normalized_dict[normalized] = ot_drug
     
-    matches = {}
-    matched_count = 0
+    best_matches = {}
+    unmatched = []
     exact_matches = 0
     fuzzy_matches = 0
     
     for fda_drug in fda_drugs:
-        best_match = None
-        best_score = 0.0
-        
-        # Create variations of FDA drug name
-        fda_variations = create_drug_name_variations(fda_drug)
+        # First, try normalized exact match (fastest, covers most drugs)
         fda_normalized = normalize_drug_name(fda_drug)
+        best_match = ot_normalized_dict.get(fda_normalized)
         
-        # First, try exact matches (fastest)
-        for fda_var in fda_variations:
-            if fda_var.lower() in ot_variations_dict:
-                best_match = ot_variations_dict[fda_var.lower()]
-                best_score = 1.0
-                exact_matches += 1
-                break
-        
-        # If no exact match, try normalized exact match
-        if best_score == 0.0 and fda_normalized in ot_normalized_dict:
-            best_match = ot_normalized_dict[fda_normalized]
-            best_score = 1.0
-            exact_matches += 1
-        
-        # If still no match, try fuzzy matching (slower)
-        if best_score == 0.0:
-            for ot_drug in ot_drugs:
-                # Skip if we already have a perfect match
-                if best_score >= 0.99:
+        # If no normalized match, try variations of the FDA drug name
+        if best_match is None:
+            for fda_var in create_drug_name_variations(fda_drug):
+                if fda_var.lower() in ot_variations_dict:
+                    best_match = ot_variations_dict[fda_var.lower()]
                     break
-                    
-                ot_normalized = normalize_drug_name(ot_drug)
-                
-                # Quick check: if normalized names are very different, skip
-                if abs(len(fda_normalized) - len(ot_normalized)) > 5:
-                    continue
-                
-                # Calculate similarity
-                similarity = SequenceMatcher(None, fda_normalized, ot_normalized).ratio()
-                
-                if similarity > best_score:
-                    best_score = similarity
-                    best_match = ot_drug
-                    
-                    # Early termination for very good matches
-                    if similarity >= 0.95:
-                        break
         
-        if best_score >= threshold:
-            matches[fda_drug] = best_match
-            matched_count += 1
-            if best_score < 1.0:
-                fuzzy_matches += 1
+        if best_match is not None:
+            best_matches[fda_drug] = best_match
+            exact_matches += 1
         else:
-            logger.debug(f"No match found for '{fda_drug}' (best score: {best_score:.3f})")
+            unmatched.append((fda_drug, fda_normalized))
+    
+    # If still no match, try fuzzy matching (slower), batched over all unmatched drugs
+    if unmatched:
+        fuzzy_results = fuzzy_best_matches([norm for _, norm in unmatched], ot_normalized_list, threshold, workers)
+        for (fda_drug, _), (idx, best_score) in zip(unmatched, fuzzy_results):
+            if idx is not None and best_score >= threshold:
+                best_matches[fda_drug] = ot_drugs[idx]
+                fuzzy_matches += 1
+            else:
+                logger.debug(f"No match found for '{fda_drug}' (best score: {best_score:.3f})")
+    
+    # Keep the FDA input order in the returned mapping
+    matches = {fda_drug: best_matches[fda_drug] for fda_drug in fda_drugs if fda_drug in best_matches}
+    matched_count = len(matches)
     
     logger.info(f"Matched {matched_count}/{len(fda_drugs)} FDA drugs to OpenTargets drugs")
     logger.info(f"  Exact matches: {exact_matches}")
@@ -382,15 +326,24 @@ def create_drug_target_mapping(fda_dilirank_df, ot_drug_target_df,
     """
     logger.info("Creating clean drug-target mapping")
     
-    # Create reverse mapping (OpenTargets -> FDA)
-    reverse_matches = {v: k for k, v in matches.items()}
-    
-    # Filter OpenTargets data to only include matched drugs
-    matched_ot_drugs = set(matches.values())
-    filtered_ot_df = ot_drug_target_df[ot_drug_target_df['drug_name'].isin(matched_ot_drugs)].copy()
-    
-    # Add FDA drug names
-    filtered_ot_df['fda_drug_name'] = filtered_ot_df['drug_name'].map(reverse_matches)
+    # Reverse mapping (OpenTargets -> FDA); the last FDA name wins for a shared OT drug
+    matches_df = pd.DataFrame({
+        'drug_name': list(matches.values()),
+        'fda_drug_name': list(matches.keys())
+    })
+    shared = matches_df['drug_name'].duplicated(keep='last')
+    if shared.any():
+        logger.warning(f"{int(shared.sum())} FDA drugs share an OpenTargets match with another FDA drug; "
+                       f"keeping the last match for each OpenTargets drug")
+        matches_df = matches_df[~shared]
+    
+    # Filter OpenTargets data to matched drugs and add FDA drug names in one join
+    filtered_ot_df = ot_drug_target_df.merge(
+        matches_df,
+        on='drug_name',
+        how='inner',
+        validate='many_to_one'
+    )
     
     # Prepare FDA DILIrank data for merge
     fda_df = fda_dilirank_df[['Compound Name', 'vDILIConcern', 'Severity Class']].copy()
@@ -399,25 +352,20 @@ def create_drug_target_mapping(fda_dilirank_df, ot_drug_target_df,
         'vDILIConcern': 'fda_dili_concern',
         'Severity Class': 'fda_severity_class'
     })
+    # Only the first DILIrank row per compound survives the pair deduplication below
+    fda_df = fda_df.drop_duplicates(subset='fda_drug_name', keep='first')
     
     # Merge with FDA DILIrank data
     merged_df = filtered_ot_df.merge(
         fda_df,
         on='fda_drug_name',
-        how='left'
+        how='left',
+        validate='many_to_one'
     )
     
-    # Add severity weights
-    severity_weights = {
-        'Most-DILI-Concern': 2.0,
-        'Less-DILI-Concern': 1.0, 
-        'No-DILI-Concern': 0.0,
-        'Ambiguous-DILI-Concern': 0.5
-    }
-    
-    merged_df['dili_severity_weight'] = merged_df['fda_dili_concern'].map(
-        severity_weights
-    ).fillna(0)
+    # Add severity weights via categorical codes (unknown concerns weigh 0)
+    codes = pd.Categorical(merged_df['fda_dili_concern'], categories=SEVERITY_WEIGHTS.index).codes
+    merged_df['dili_severity_weight'] = np.where(codes >= 0, SEVERITY_WEIGHTS.to_numpy()[codes], 0.0)
     
     # Ensure unique column names
     if 'drugId' in merged_df.columns:
@@ -0,0 +1,16 @@
+"""
+Parquet Writer Settings.
+
+Shared pyarrow writer settings for every parquet file the pipeline writes.
+"""
+
+# Valid both as DataFrame.to_parquet keyword arguments (with index=False) and for
+# pyarrow.parquet.write_table. Low-cardinality columns dictionary-encode well and
+# zstd keeps the interim and processed tables small
+PARQUET_WRITE_OPTIONS = dict(
+    compression='zstd',
+    compression_level=3,
+    use_dictionary=True,
+    row_group_size=64_000,
+    data_page_size=1 << 20,
+)
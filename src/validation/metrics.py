@@ -1,68 +1,103 @@
 import logging
+import numpy as np
 import pandas as pd
 
-def compute_approval_rates(drug_target_df: pd.DataFrame) -> pd.DataFrame:
+def _unique_pairs(drug_target_df: pd.DataFrame):
+    # Factorize each key once and pack (target, drug) codes into one int64 so deduplication is a
+    # single np.unique; returns first-occurrence positions, their target codes and the targets
+    target_codes, targets = pd.factorize(drug_target_df['target_symbol'], use_na_sentinel=False)
+    drug_codes, _ = pd.factorize(drug_target_df['fda_drug_name'], use_na_sentinel=False)
+    keys = (target_codes.astype(np.int64) << 32) | drug_codes.astype(np.int64)
+    first_idx = np.sort(np.unique(keys, return_index=True)[1])
+    return first_idx, target_codes[first_idx], targets
+
+def _equals(values: pd.Series, value: str) -> np.ndarray:
+    # Compare each distinct value once and gather the result by code, so categorical and
+    # dictionary-encoded status columns compare small integer codes instead of strings
+    codes, uniques = pd.factorize(values)
+    return np.append(np.asarray(uniques == value, dtype=bool), False)[codes]
+
+def _count_by_target(drug_target_df: pd.DataFrame, pairs, flag: np.ndarray, flag_name: str) -> pd.DataFrame:
+    # Count drugs and flagged drugs per target over the unique pairs; selecting codes with boolean
+    # masks keeps np.bincount on its integer path instead of converting weights to float64
+    first_idx, codes, targets = pairs
+    has_drug = drug_target_df['fda_drug_name'].notna().to_numpy()[first_idx]
+    flagged = np.asarray(flag, dtype=bool)[first_idx]
+    stats = pd.DataFrame({
+        'total_drugs': np.bincount(codes[has_drug], minlength=len(targets)).astype(np.int32),
+        flag_name: np.bincount(codes[flagged], minlength=len(targets)).astype(np.int32)
+    }, index=pd.Index(targets, name='target_symbol'))
+    # Rows without a target symbol are not a group, as in groupby
+    return stats[stats.index.notna()]
+
+def compute_approval_rates(drug_target_df: pd.DataFrame, pairs=None) -> pd.DataFrame:
     logger = logging.getLogger(__name__)
     logger.info("Computing approval rates per target...")
     
     # Deduplicate drug-target pairs to match risk scoring process
-    drug_target_dedup = drug_target_df.drop_duplicates(
-        subset=['fda_drug_name', 'target_symbol'], 
-        keep='first'
-    )
-    logger.info(f"Deduplicated from {len(drug_target_df)} to {len(drug_target_dedup)} unique drug-target pairs for validation")
+    if pairs is None:
+        pairs = _unique_pairs(drug_target_df)
+    logger.info(f"Deduplicated from {len(drug_target_df)} to {len(pairs[0])} unique drug-target pairs for validation")
     
-    if 'approval_status' not in drug_target_dedup.columns:
+    if 'approval_status' not in drug_target_df.columns:
         logger.warning("No approval status data available. Using DILI concern as proxy for approval.")
-        approval_stats = drug_target_dedup.groupby('target_symbol').agg({
-            'fda_drug_name': 'count',
-            'fda_dili_concern': lambda x: (x == 'No-DILI-Concern').sum()
-        }).rename(columns={
-            'fda_drug_name': 'total_drugs',
-            'fda_dili_concern': 'safe_drugs'
-        })
+        approval_stats = _count_by_target(
+            drug_target_df, pairs, _equals(drug_target_df['fda_dili_concern'], 'No-DILI-Concern'), 'safe_drugs'
+        )
         approval_stats['approval_rate'] = (
             approval_stats['safe_drugs'] / approval_stats['total_drugs']
         ).fillna(0)
     else:
-        approval_stats = drug_target_dedup.groupby('target_symbol').agg({
-            'fda_drug_name': 'count',
-            'approval_status': lambda x: (x == 'approved').sum()
-        }).rename(columns={
-            'fda_drug_name': 'total_drugs',
-            'approval_status': 'approved_drugs'
-        })
+        approval_stats = _count_by_target(
+            drug_target_df, pairs, _equals(drug_target_df['approval_status'], 'approved'), 'approved_drugs'
+        )
         approval_stats['approval_rate'] = (
             approval_stats['approved_drugs'] / approval_stats['total_drugs']
         ).fillna(0)
-    approval_stats = approval_stats[approval_stats['total_drugs'] > 0]
+    # Sorted target indexes let the validation joins take pandas' monotonic merge path
+    approval_stats = approval_stats[approval_stats['total_drugs'] > 0].sort_index()
     logger.info(f"Computed approval rates for {len(approval_stats)} targets")
     logger.info(f"Approval rate range: {approval_stats['approval_rate'].min():.3f} - {approval_stats['approval_rate'].max():.3f}")
     return approval_stats
 
-def compute_withdrawal_rates(drug_target_df: pd.DataFrame) -> pd.DataFrame:
+def compute_withdrawal_rates(drug_target_df: pd.DataFrame, pairs=None) -> pd.DataFrame:
     logger = logging.getLogger(__name__)
     logger.info("Computing withdrawal rates per target...")
     
-    # Deduplicate drug-target pairs to match risk scoring process
-    drug_target_dedup = drug_target_df.drop_duplicates(
-        subset=['fda_drug_name', 'target_symbol'], 
-        keep='first'
-    )
-    
-    if 'withdrawn' not in drug_target_dedup.columns:
+    if 'withdrawn' not in drug_target_df.columns:
         logger.warning("No withdrawn status data available. Skipping withdrawal rate computation.")
         return pd.DataFrame()
-    withdrawal_stats = drug_target_dedup.groupby('target_symbol').agg({
-        'fda_drug_name': 'count',
-        'withdrawn': 'sum'
-    }).rename(columns={
-        'fda_drug_name': 'total_drugs',
-        'withdrawn': 'withdrawn_drugs'
-    })
+    # Deduplicate drug-target pairs to match risk scoring process
+    if pairs is None:
+        pairs = _unique_pairs(drug_target_df)
+    withdrawal_stats = _count_by_target(
+        drug_target_df, pairs, drug_target_df['withdrawn'].astype(np.float64).to_numpy() > 0, 'withdrawn_drugs'
+    )
     withdrawal_stats['withdrawal_rate'] = (
         withdrawal_stats['withdrawn_drugs'] / withdrawal_stats['total_drugs']
     ).fillna(0)
-    withdrawal_stats = withdrawal_stats[withdrawal_stats['total_drugs'] > 0]
+    withdrawal_stats = withdrawal_stats[withdrawal_stats['total_drugs'] > 0].sort_index()
     logger.info(f"Computed withdrawal rates for {len(withdrawal_stats)} targets")
-    return withdrawal_stats 
\ No newline at end of file
+    return withdrawal_stats 
+
+def compute_rates(drug_target_df: pd.DataFrame) -> pd.DataFrame:
+    # Approval and withdrawal rates per target from a single deduplication pass; both share the
+    # same targets, so the withdrawal columns line up with the approval rows
+    pairs = _unique_pairs(drug_target_df)
+    rates = compute_approval_rates(drug_target_df, pairs)
+    withdrawal_stats = compute_withdrawal_rates(drug_target_df, pairs)
+    if withdrawal_stats.empty:
+        return rates
+    return rates.join(withdrawal_stats[['withdrawn_drugs', 'withdrawal_rate']], how='left')
+
+def pearson_correlation(x: pd.Series, y: pd.Series) -> float:
+    # Centered dot product over pairwise-complete values (same result as Series.corr)
+    x = x.to_numpy(dtype=np.float64)
+    y = y.to_numpy(dtype=np.float64)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if valid.sum() < 2:
+        return np.nan
+    xc = x[valid] - x[valid].mean()
+    yc = y[valid] - y[valid].mean()
+    den = np.sqrt((xc @ xc) * (yc @ yc))
+    return float(xc @ yc / den) if den > 0 else np.nan
@@ -1,85 +1,96 @@
-import matplotlib.pyplot as plt
-import numpy as np
 import matplotlib as mpl
+# Plots are only written to files; select the non-interactive backend before pyplot loads
+mpl.use('Agg')
+import numpy as np
 import logging
 
-def plot_risk_vs_approval(validation_df, out_path='results/risk_vs_approval.png'):
-    logger = logging.getLogger(__name__)
+# Split long paths into chunks so Agg rasterizes them faster
+mpl.rcParams['path.simplify'] = True
+mpl.rcParams['agg.path.chunksize'] = 10000
+
+# Plots are saved at DEFAULT_DPI; above LARGE_PLOT_POINTS points they drop to LARGE_PLOT_DPI
+DEFAULT_DPI = 150
+LARGE_PLOT_DPI = 120
+LARGE_PLOT_POINTS = 5000
+
+# Risk score magnitudes that get an annotated target, and where each label sits
+LABEL_MAGNITUDES = [1e-4, 1e-3, 1e-2, 1e-1, 1.0]
+LABEL_OFFSETS = [(0, 15), (0, -20), (30, 0), (-30, 0), (0, 25)]
+
+def _nearest_indices(x, targets):
+    # Positions of the values in x closest to each target (first position on ties, like argmin),
+    # found with one sort and a binary search instead of a full scan per target
+    order = np.argsort(x, kind='stable')
+    sx = x[order]
+    pos = np.searchsorted(sx, targets)
+    right = np.minimum(pos, len(sx) - 1)
+    # Step back to the first sorted position of the left neighbour's value, i.e. its first occurrence
+    left = np.searchsorted(sx, sx[np.maximum(pos - 1, 0)])
+    left_dist = np.abs(sx[left] - targets)
+    right_dist = np.abs(sx[right] - targets)
+    nearest = np.where(left_dist < right_dist, order[left], order[right])
+    return np.where(left_dist == right_dist, np.minimum(order[left], order[right]), nearest)
+
+def _scatter_vs_risk(validation_df, y_col, out_path, ylabel, dpi=None):
+    # pyplot is only loaded once a plot is actually drawn
+    import matplotlib.pyplot as plt
     x = validation_df['dili_risk_score'].values
-    y = validation_df['approval_rate'].values
+    y = validation_df[y_col].values
     c = validation_df['dili_risk_score'].values
     fig, ax = plt.subplots(figsize=(8, 6))
-    if 'target_symbol' not in validation_df.columns:
-        validation_df = validation_df.reset_index()
-    if np.any(c > 0):
-        norm = mpl.colors.LogNorm(vmin=np.min(c[c > 0]), vmax=np.max(c))
+    # Target symbols for the annotations, from the column or the index, without copying the frame
+    if 'target_symbol' in validation_df.columns:
+        labels = validation_df['target_symbol'].to_numpy()
+    elif validation_df.index.name == 'target_symbol':
+        labels = validation_df.index.to_numpy()
+    else:
+        labels = None
+    # Smallest positive score via a masked reduction (no boolean-indexed copy); inf when none
+    vmin_positive = np.min(c, where=c > 0, initial=np.inf)
+    if np.isfinite(vmin_positive):
+        norm = mpl.colors.LogNorm(vmin=vmin_positive, vmax=np.max(c))
     else:
         norm = mpl.colors.Normalize(vmin=np.min(c), vmax=np.max(c))
     cmap = plt.get_cmap('coolwarm')
-    sc = ax.scatter(x, y, c=c, cmap=cmap, norm=norm, s=50, edgecolor='k', alpha=0.8)
+    # Draw in score order so the highest-risk points sit on top; rasterize the markers so vector
+    # outputs do not stroke every edge as its own path
+    draw_order = np.argsort(c, kind='stable')
+    sc = ax.scatter(x[draw_order], y[draw_order], c=c[draw_order], cmap=cmap, norm=norm, s=50,
+                    edgecolor='k', alpha=0.8, rasterized=True)
     ax.set_xscale('log')
     ax.set_xlabel('DILI Risk Score')
-    ax.set_ylabel('Approval Rate')
+    ax.set_ylabel(ylabel)
     ax.spines['top'].set_visible(False)
     ax.spines['right'].set_visible(False)
-    mags = [1e-4, 1e-3, 1e-2, 1e-1, 1.0]
-    offsets = [(0, 15), (0, -20), (30, 0), (-30, 0), (0, 25)]
-    for i, mag in enumerate(mags):
-        idx = (np.abs(x - mag)).argmin()
-        row = validation_df.iloc[idx]
-        label = row['target_symbol'] if 'target_symbol' in row else str(idx)
-        dx, dy = offsets[i % len(offsets)]
-        ax.annotate(f"{label}\n({format_sig(row['dili_risk_score'])})",
-                    (row['dili_risk_score'], row['approval_rate']),
+    for i, idx in enumerate(_nearest_indices(x, np.asarray(LABEL_MAGNITUDES))):
+        label = labels[idx] if labels is not None else str(idx)
+        dx, dy = LABEL_OFFSETS[i % len(LABEL_OFFSETS)]
+        ax.annotate(f"{label}\n({format_sig(x[idx])})",
+                    (x[idx], y[idx]),
                     textcoords="offset points", xytext=(dx, dy), ha='center', fontsize=9,
                     bbox=dict(boxstyle="round,pad=0.2", fc="white", ec="none", lw=0, alpha=0.8),
                     arrowprops=dict(arrowstyle="->", color="blue", lw=1, alpha=0.7))
     plt.tight_layout()
-    plt.savefig(out_path, dpi=150)
+    if dpi is None:
+        dpi = LARGE_PLOT_DPI if len(x) > LARGE_PLOT_POINTS else DEFAULT_DPI
+    plt.savefig(out_path, dpi=dpi)
     plt.close()
+
+def plot_risk_vs_approval(validation_df, out_path='results/risk_vs_approval.png', dpi=None):
+    logger = logging.getLogger(__name__)
+    _scatter_vs_risk(validation_df, 'approval_rate', out_path, 'Approval Rate', dpi)
     logger.info(f"Saved risk vs approval plot to {out_path}")
 
-def plot_risk_vs_withdrawal(validation_df, out_path='results/risk_vs_withdrawal.png'):
+def plot_risk_vs_withdrawal(validation_df, out_path='results/risk_vs_withdrawal.png', dpi=None):
     logger = logging.getLogger(__name__)
     if 'withdrawal_rate' not in validation_df.columns:
         logger.warning("No withdrawal_rate column in validation_df. Skipping plot.")
         return
-    x = validation_df['dili_risk_score'].values
-    y = validation_df['withdrawal_rate'].values
-    c = validation_df['dili_risk_score'].values
-    fig, ax = plt.subplots(figsize=(8, 6))
-    if 'target_symbol' not in validation_df.columns:
-        validation_df = validation_df.reset_index()
-    if np.any(c > 0):
-        norm = mpl.colors.LogNorm(vmin=np.min(c[c > 0]), vmax=np.max(c))
-    else:
-        norm = mpl.colors.Normalize(vmin=np.min(c), vmax=np.max(c))
-    cmap = plt.get_cmap('coolwarm')
-    sc = ax.scatter(x, y, c=c, cmap=cmap, norm=norm, s=50, edgecolor='k', alpha=0.8)
-    ax.set_xscale('log')
-    ax.set_xlabel('DILI Risk Score')
-    ax.set_ylabel('Withdrawal Rate')
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    mags = [1e-4, 1e-3, 1e-2, 1e-1, 1.0]
-    offsets = [(0, 15), (0, -20), (30, 0), (-30, 0), (0, 25)]
-    for i, mag in enumerate(mags):
-        idx = (np.abs(x - mag)).argmin()
-        row = validation_df.iloc[idx]
-        label = row['target_symbol'] if 'target_symbol' in row else str(idx)
-        dx, dy = offsets[i % len(offsets)]
-        ax.annotate(f"{label}\n({format_sig(row['dili_risk_score'])})",
-                    (row['dili_risk_score'], row['withdrawal_rate']),
-                    textcoords="offset points", xytext=(dx, dy), ha='center', fontsize=9,
-                    bbox=dict(boxstyle="round,pad=0.2", fc="white", ec="none", lw=0, alpha=0.8),
-                    arrowprops=dict(arrowstyle="->", color="blue", lw=1, alpha=0.7))
-    plt.tight_layout()
-    plt.savefig(out_path, dpi=150)
-    plt.close()
+    _scatter_vs_risk(validation_df, 'withdrawal_rate', out_path, 'Withdrawal Rate', dpi)
     logger.info(f"Saved risk vs withdrawal plot to {out_path}")
 
 def format_sig(x, sig=1):
     if x == 0:
         return "0"
     from math import log10, floor
-    return f"{round(x, -int(floor(log10(abs(x)))) + (sig - 1))}" 
\ No newline at end of file
+    return f"{round(x, -int(floor(log10(abs(x)))) + (sig - 1))}" 
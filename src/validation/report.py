@@ -1,84 +1,131 @@
 import logging
 from datetime import datetime
+from functools import lru_cache
+from math import log10, floor
 import numpy as np
+import pandas as pd
 
+# Columns shown for each of the top risk targets (missing ones print as nan)
+REPORT_COLUMNS = ['dili_risk_score', 'risk_category', 'total_dili_weight_normalized', 'network_dili_score_normalized',
+                  'approved_drugs', 'withdrawn_drugs', 'approval_rate', 'withdrawal_rate', 'total_drugs']
+
+# Top-N scores repeat (ties, rounded values), so identical inputs are formatted once
+@lru_cache(maxsize=2048, typed=True)
 def format_sig(x, sig=1):
     if x == 0:
         return "0"
-    from math import log10, floor
     return f"{round(x, -int(floor(log10(abs(x)))) + (sig - 1))}"
 
-def generate_validation_report(validation_df, output_path):
-    logger = logging.getLogger(__name__)
-    report_lines = []
-    report_lines.append("Target DILI Risk Score - Validation Report")
-    report_lines.append("=" * 50)
-    report_lines.append(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    report_lines.append("")
-    report_lines.append("SUMMARY STATISTICS")
-    report_lines.append("-" * 20)
-    report_lines.append(f"Total targets analyzed: {len(validation_df)}")
+def top_positions(scores, k=10):
+    # Positions of the k largest scores, largest first with ties in row order and NaNs last like
+    # DataFrame.nlargest, selected with an O(N) partition instead of a full sort
+    valid = np.flatnonzero(~np.isnan(scores))
+    if len(valid) > k:
+        threshold = np.partition(scores[valid], len(valid) - k)[len(valid) - k]
+        above = valid[scores[valid] > threshold]
+        ties = valid[scores[valid] == threshold][:k - len(above)]
+        valid = np.concatenate([above, ties])
+    top = valid[np.lexsort((valid, -scores[valid]))]
+    if len(top) < k:
+        top = np.concatenate([top, np.flatnonzero(np.isnan(scores))[:k - len(top)]])
+    return top
+
+def drug_count(rate, total_drugs):
+    # Recover an integer drug count from a rate; single precision is exact enough to round
+    # a 0-1 rate times a small count, and keeps the product out of float64
+    product = rate.to_numpy(dtype=np.float32) * total_drugs.to_numpy(dtype=np.float32)
+    return np.rint(product, out=product).astype(np.int32)
+
+def _report_lines(validation_df):
+    # Yield the report one line at a time so it is written out as it is formatted
+    yield "Target DILI Risk Score - Validation Report"
+    yield "=" * 50
+    yield f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+    yield ""
+    yield "SUMMARY STATISTICS"
+    yield "-" * 20
+    yield f"Total targets analyzed: {len(validation_df)}"
     if 'dili_risk_score' in validation_df.columns:
-        report_lines.append(f"Mean DILI risk score: {format_sig(validation_df['dili_risk_score'].mean())}")
-        report_lines.append(f"Risk score range: {format_sig(validation_df['dili_risk_score'].min())} - {format_sig(validation_df['dili_risk_score'].max())}")
+        # Pull the scores out once and reduce the array, rather than three pandas reductions
+        scores = validation_df['dili_risk_score'].to_numpy(dtype=np.float64, na_value=np.nan)
+        yield f"Mean DILI risk score: {format_sig(np.nanmean(scores))}"
+        yield f"Risk score range: {format_sig(np.nanmin(scores))} - {format_sig(np.nanmax(scores))}"
     if 'approval_rate' in validation_df.columns:
-        report_lines.append(f"Mean approval rate: {validation_df['approval_rate'].mean():.3f}")
+        yield f"Mean approval rate: {validation_df['approval_rate'].mean():.3f}"
     if 'withdrawal_rate' in validation_df.columns:
-        report_lines.append(f"Mean withdrawal rate: {validation_df['withdrawal_rate'].mean():.3f}")
-    if 'correlation_with_approval' in validation_df.columns:
-        correlation = validation_df['correlation_with_approval'].iloc[0]
-        report_lines.append("")
-        report_lines.append("VALIDATION RESULTS")
-        report_lines.append("-" * 20)
-        report_lines.append(f"DILI risk score vs approval rate correlation: {correlation:.3f}")
+        yield f"Mean withdrawal rate: {validation_df['withdrawal_rate'].mean():.3f}"
+    if 'correlation_with_approval' in validation_df.attrs:
+        correlation = validation_df.attrs['correlation_with_approval']
+        yield ""
+        yield "VALIDATION RESULTS"
+        yield "-" * 20
+        yield f"DILI risk score vs approval rate correlation: {correlation:.3f}"
         if correlation < 0:
-            report_lines.append("✓ Negative correlation: Higher DILI risk targets have lower approval rates")
+            yield "✓ Negative correlation: Higher DILI risk targets have lower approval rates"
         else:
-            report_lines.append("⚠ Positive correlation: Higher DILI risk targets have higher approval rates")
-    if 'correlation_with_withdrawal' in validation_df.columns:
-        correlation = validation_df['correlation_with_withdrawal'].iloc[0]
-        report_lines.append(f"DILI risk score vs withdrawal rate correlation: {correlation:.3f}")
+            yield "⚠ Positive correlation: Higher DILI risk targets have higher approval rates"
+    if 'correlation_with_withdrawal' in validation_df.attrs:
+        correlation = validation_df.attrs['correlation_with_withdrawal']
+        yield f"DILI risk score vs withdrawal rate correlation: {correlation:.3f}"
         if correlation > 0:
-            report_lines.append("✓ Positive correlation: Higher DILI risk targets have higher withdrawal rates")
+            yield "✓ Positive correlation: Higher DILI risk targets have higher withdrawal rates"
         else:
-            report_lines.append("⚠ Negative correlation: Higher DILI risk targets have lower withdrawal rates")
+            yield "⚠ Negative correlation: Higher DILI risk targets have lower withdrawal rates"
     if 'risk_category' in validation_df.columns:
-        report_lines.append("")
-        report_lines.append("RISK CATEGORY DISTRIBUTION")
-        report_lines.append("-" * 30)
+        yield ""
+        yield "RISK CATEGORY DISTRIBUTION"
+        yield "-" * 30
         category_counts = validation_df['risk_category'].value_counts()
-        for category, count in category_counts.items():
-            report_lines.append(f"{category} risk: {count} targets")
+        yield from (category_counts.index.astype(str) + ' risk: '
+                    + category_counts.to_numpy().astype(str) + ' targets').tolist()
     if 'dili_risk_score' in validation_df.columns:
-        report_lines.append("")
-        report_lines.append("TOP 10 HIGHEST DILI RISK TARGETS")
-        report_lines.append("-" * 30)
-        top_risk = validation_df.nlargest(10, 'dili_risk_score').copy()
+        yield ""
+        yield "TOP 10 HIGHEST DILI RISK TARGETS"
+        yield "-" * 30
+        top_risk = validation_df.iloc[top_positions(scores, 10)]
+        # reindex builds a new frame, so derived counts go into it without copying top_risk first
+        columns = top_risk.reindex(columns=REPORT_COLUMNS)
 
         # Compute number of approved and withdrawn drugs if not present
         if 'approved_drugs' not in top_risk.columns or 'withdrawn_drugs' not in top_risk.columns:
             # Try to infer from available columns
             if 'approval_rate' in top_risk.columns and 'total_drugs' in top_risk.columns:
-                top_risk['approved_drugs'] = np.round(top_risk['approval_rate'] * top_risk['total_drugs']).astype(int)
+                columns['approved_drugs'] = drug_count(top_risk['approval_rate'], top_risk['total_drugs'])
             else:
-                top_risk['approved_drugs'] = np.nan
+                columns['approved_drugs'] = np.nan
             if 'withdrawal_rate' in top_risk.columns and 'total_drugs' in top_risk.columns:
-                top_risk['withdrawn_drugs'] = np.round(top_risk['withdrawal_rate'] * top_risk['total_drugs']).astype(int)
+                columns['withdrawn_drugs'] = drug_count(top_risk['withdrawal_rate'], top_risk['total_drugs'])
             else:
-                top_risk['withdrawn_drugs'] = np.nan
+                columns['withdrawn_drugs'] = np.nan
 
-        for idx, row in top_risk.iterrows():
-            target_name = row['target_symbol'] if 'target_symbol' in row else (idx if isinstance(idx, str) else f"Target_{idx}")
-            line = f"{target_name}: {format_sig(row['dili_risk_score'])} ({row['risk_category']})"
-            line += f" | Direct: {row.get('total_dili_weight_normalized', 'N/A'):.3f}"
-            line += f" | Network: {row.get('network_dili_score_normalized', 'N/A'):.3f}"
-            line += f" | Approved: {row['approved_drugs']}"
-            line += f" | Withdrawn: {row['withdrawn_drugs']}"
-            line += f" | Approval: {row['approval_rate']:.3f}"
-            line += f" | Withdrawal: {row['withdrawal_rate']:.3f}"
-            line += f" | Drugs: {row['total_drugs']}"
-            report_lines.append(line)
+        # Format each column once and concatenate the pieces row-wise
+        if 'target_symbol' in top_risk.columns:
+            target_names = top_risk['target_symbol'].astype(str)
+        else:
+            target_names = pd.Series([idx if isinstance(idx, str) else f"Target_{idx}" for idx in top_risk.index],
+                                     index=top_risk.index)
+
+        def fixed3(col):
+            return columns[col].map('{:.3f}'.format)
+
+        lines = (
+            target_names + ': ' + columns['dili_risk_score'].map(format_sig)
+            + ' (' + columns['risk_category'].astype(str) + ')'
+            + ' | Direct: ' + fixed3('total_dili_weight_normalized')
+            + ' | Network: ' + fixed3('network_dili_score_normalized')
+            + ' | Approved: ' + columns['approved_drugs'].astype(str)
+            + ' | Withdrawn: ' + columns['withdrawn_drugs'].astype(str)
+            + ' | Approval: ' + fixed3('approval_rate')
+            + ' | Withdrawal: ' + fixed3('withdrawal_rate')
+            + ' | Drugs: ' + columns['total_drugs'].astype(str)
+        )
+        yield from lines.tolist()
 
-    with open(output_path, 'w') as f:
-        f.write('\n'.join(report_lines))
-    logger.info(f"Validation report saved to {output_path}") 
\ No newline at end of file
+def generate_validation_report(validation_df, output_path):
+    logger = logging.getLogger(__name__)
+    # Stream lines into a 64 KiB buffer instead of joining the whole report in memory first
+    with open(output_path, 'w', buffering=1 << 16) as f:
+        lines = _report_lines(validation_df)
+        f.write(next(lines))
+        f.writelines('\n' + line for line in lines)
+    logger.info(f"Validation report saved to {output_path}") 
@@ -7,19 +7,24 @@ to assess the biological relevance of the risk scores.
 
 import pandas as pd
 import numpy as np
+import pyarrow.parquet as pq
 import logging
+import json
 from pathlib import Path
 from typing import Dict, Optional
 from datetime import datetime
-import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
+from concurrent.futures import ThreadPoolExecutor
 
-from .metrics import compute_approval_rates, compute_withdrawal_rates
+from utils.parquet_io import PARQUET_WRITE_OPTIONS
+from .metrics import compute_rates, pearson_correlation
 from .report import generate_validation_report
 from .plots import plot_risk_vs_approval, plot_risk_vs_withdrawal
 
 logger = logging.getLogger(__name__)
 
+# Drug-target table columns read by the approval and withdrawal metrics
+VALIDATION_COLUMNS = ['target_symbol', 'fda_drug_name', 'fda_dili_concern', 'approval_status', 'withdrawn']
+
 
 class Validator:
     """Simple validator for DILI risk scores against approval rates."""
@@ -52,7 +57,13 @@ class Validator:
             logger.error("Drug-target table not found. Run ETL first.")
             return pd.DataFrame()
         
-        drug_target_df = pd.read_parquet(drug_target_path)
+        # Only the columns used by the rate metrics, kept Arrow-backed
+        available = set(pq.read_schema(drug_target_path).names)
+        drug_target_df = pd.read_parquet(
+            drug_target_path,
+            columns=[col for col in VALIDATION_COLUMNS if col in available],
+            dtype_backend='pyarrow'
+        )
         
         # Load risk scores
         risk_scores_path = self.processed_dir / "dili_risk_scores.parquet"
@@ -60,24 +71,29 @@ class Validator:
             logger.error("DILI risk scores not found. Run risk scoring first.")
             return pd.DataFrame()
         
+        # Every risk score column is carried into validation_results, so the read is not projected
         risk_scores = pd.read_parquet(risk_scores_path)
-        risk_scores = risk_scores.set_index('target_symbol')
+        # Scores written by the scorer round-trip risk_category as categorical already; older
+        # or externally written files get the cast here so value_counts works on codes
+        if 'risk_category' in risk_scores.columns:
+            risk_scores['risk_category'] = risk_scores['risk_category'].astype('category')
+        risk_scores = risk_scores.set_index('target_symbol').sort_index()
         
-        # Compute approval rates
-        approval_rates = compute_approval_rates(drug_target_df)
-        # Compute withdrawal rates
-        withdrawal_rates = compute_withdrawal_rates(drug_target_df)
+        # Compute approval and withdrawal rates
+        rates = compute_rates(drug_target_df)
         # Validate risk scores
-        validation_df = risk_scores.merge(approval_rates, left_index=True, right_index=True, how='inner')
-        if not withdrawal_rates.empty:
-            validation_df = validation_df.merge(
-                withdrawal_rates[['withdrawal_rate']], left_index=True, right_index=True, how='left'
-            )
+        validation_df = risk_scores.join(rates, how='inner')
+        # Correlations are scalars, so keep them in attrs rather than as repeated columns
         # Correlation with approval
-        validation_df['correlation_with_approval'] = validation_df['dili_risk_score'].corr(validation_df['approval_rate'])
+        validation_df.attrs['correlation_with_approval'] = pearson_correlation(validation_df['dili_risk_score'], validation_df['approval_rate'])
         # Correlation with withdrawal
         if 'withdrawal_rate' in validation_df.columns:
-            validation_df['correlation_with_withdrawal'] = validation_df['dili_risk_score'].corr(validation_df['withdrawal_rate'])
+            validation_df.attrs['correlation_with_withdrawal'] = pearson_correlation(validation_df['dili_risk_score'], validation_df['withdrawal_rate'])
+        # Also keep the correlations beside the report, for readers that don't load the parquet
+        stats_path = self.results_dir / "validation_stats.json"
+        # An undefined correlation is NaN, which JSON cannot represent, so it is written as null
+        stats = {key: None if np.isnan(value) else value for key, value in validation_df.attrs.items()}
+        stats_path.write_text(json.dumps(stats, indent=2, allow_nan=False))
         # Report
         report_path = self.results_dir / "validation_report.txt"
         generate_validation_report(validation_df, report_path)
@@ -85,11 +101,17 @@ class Validator:
         output_path = self.processed_dir / "validation_results.parquet"
         # Reset index to include target symbols as a column
         validation_df = validation_df.reset_index()
-        validation_df.to_parquet(output_path, index=False)
+        # Encode the parquet file in a worker (pyarrow releases the GIL) while the plots render;
+        # pyplot keeps global state, so the plots themselves stay on this thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            write = executor.submit(
+                validation_df.to_parquet, output_path, index=False, **PARQUET_WRITE_OPTIONS
+            )
+            # Plots
+            plot_risk_vs_approval(validation_df)
+            plot_risk_vs_withdrawal(validation_df)
+            write.result()
         logger.info(f"Saved validation results to {output_path}")
-        # Plots
-        plot_risk_vs_approval(validation_df)
-        plot_risk_vs_withdrawal(validation_df)
         logger.info("=== Validation Complete ===")
         
         return validation_df 
\ No newline at end of file